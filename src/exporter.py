@@ -84,13 +84,11 @@ def render_composition_to_wav(composition: Composition, instruments: Dict[str, I
                         # that was used to trigger the note.
                         inst.note_off(note_name)
 
-            # Generate audio from all instruments using the correct chunk size
-            chunk_buffer = np.zeros(current_chunk_size, dtype=np.float32)
+            # Generate audio from all instruments using the correct chunk size,
+            # mixing straight into the (zero-initialised) mixdown slice
+            chunk_buffer = mixdown[start_frame:end_frame]
             for instrument in instruments.values():
                 chunk_buffer += instrument.process(current_chunk_size)
-            
-            # Assign the generated chunk to the mixdown buffer
-            mixdown[start_frame:end_frame] = chunk_buffer
 
         # --- Finalization ---
         max_amplitude = np.max(np.abs(mixdown))
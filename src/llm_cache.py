@@ -0,0 +1,40 @@
+from collections import OrderedDict
+from typing import Optional
+
+
+class InMemoryLLMCache:
+    """A bounded, least-recently-used cache of LLM responses.
+
+    Entries are keyed by the user prompt together with a digest of the
+    composition context it was sent with, so the same prompt against a
+    different composition is never served a stale answer.
+    """
+
+    def __init__(self, max_size: int = 128):
+        self.max_size = max_size
+        self._entries = OrderedDict()  # (prompt, context digest) -> music_data
+
+    def lookup(self, prompt: str, context_hash: str) -> Optional[dict]:
+        """Returns the cached response for the prompt and context, or None."""
+        key = (prompt, context_hash)
+        music_data = self._entries.get(key)
+        if music_data is not None:
+            self._entries.move_to_end(key)
+        return music_data
+
+    def update(self, prompt: str, context_hash: str, music_data: dict) -> None:
+        """Stores a response, evicting the least recently used entry when full."""
+        key = (prompt, context_hash)
+        self._entries[key] = music_data
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> int:
+        """Empties the cache and returns how many entries were dropped."""
+        count = len(self._entries)
+        self._entries.clear()
+        return count
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -71,26 +71,48 @@ class LLMGenerator:
             system_instruction=SYSTEM_PROMPT
         )
 
-    def generate_music_from_prompt(self, user_prompt: str, context_composition: dict = None):
-        """Sends the user prompt and context to the LLM to get a modified composition."""
-        
+    def _build_prompt(self, user_prompt: str, context_composition: dict = None, context_json: str = None) -> str:
+        """Combines the composition context and the user request into a single prompt.
+
+        The context can be given as a dict or as already-encoded JSON. The composition
+        comes before the user request so the prompt prefix stays the same across turns.
+        """
         full_prompt = []
-        if context_composition:
+        if context_json is None and context_composition:
             context_json = json.dumps(context_composition, indent=2)
+        if context_json:
             full_prompt.append(f"Here is the current composition:\n\n```json\n{context_json}\n```")
         
         full_prompt.append(f"User request: '{user_prompt}'")
         
-        final_prompt_str = "\n\n".join(full_prompt)
+        return "\n\n".join(full_prompt)
+
+    def _parse_response(self, response) -> dict:
+        """Extracts the composition dictionary from the model's reply."""
+        # Clean up the response to get only the JSON part
+        json_text = response.text.strip().replace('```json', '').replace('```', '').strip()
+        
+        # Parse the JSON string into a Python dictionary
+        return json.loads(json_text)
+
+    def generate_music_from_prompt(self, user_prompt: str, context_composition: dict = None, context_json: str = None):
+        """Sends the user prompt and context to the LLM to get a modified composition."""
+        final_prompt_str = self._build_prompt(user_prompt, context_composition, context_json)
 
         try:
             response = self.model.generate_content(final_prompt_str)
-            # Clean up the response to get only the JSON part
-            json_text = response.text.strip().replace('```json', '').replace('```', '').strip()
-            
-            # Parse the JSON string into a Python dictionary
-            music_data = json.loads(json_text)
-            return music_data, None
+            return self._parse_response(response), None
+        except Exception as e:
+            print(f"[LLM Generator] Error: {e}")
+            return None, str(e)
+
+    async def agenerate_music_from_prompt(self, user_prompt: str, context_composition: dict = None, context_json: str = None):
+        """Async version of generate_music_from_prompt; awaits the request instead of blocking the event loop."""
+        final_prompt_str = self._build_prompt(user_prompt, context_composition, context_json)
+
+        try:
+            response = await self.model.generate_content_async(final_prompt_str)
+            return self._parse_response(response), None
         except Exception as e:
             print(f"[LLM Generator] Error: {e}")
             return None, str(e)
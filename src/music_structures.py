@@ -1,10 +1,11 @@
 from dataclasses import dataclass, field, fields
-from typing import List, Optional
+from typing import List, Optional, Tuple
+import numpy as np
 
 # --- Configuration ---
 STEPS_PER_PATTERN = 64  # Default number of steps in a pattern
 
-@dataclass
+@dataclass(slots=True)  # Slots: smaller instances and faster attribute reads in hot loops
 class NoteEvent:
     """Represents a single note event in a pattern."""
     note: Optional[str] = None  # e.g., 'C4', 'F#5'
@@ -30,7 +31,7 @@ class NoteEvent:
         
         return cls(**filtered_data)
 
-@dataclass
+@dataclass(slots=True)
 class Pattern:
     """A pattern is a sequence of steps, where each step can hold a note."""
     steps: List[Optional[NoteEvent]] = field(default_factory=lambda: [None] * STEPS_PER_PATTERN)
@@ -42,6 +43,26 @@ class Pattern:
     def from_dict(cls, data):
         return cls(steps=[NoteEvent.from_dict(step_data) if step_data else None for step_data in data['steps']])
 
+    def to_soa(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the steps as parallel (key number, velocity, duration) arrays.
+
+        Key numbers follow synthesis (A4=49); rests are -1 with zero velocity and duration.
+        Built on each call rather than cached, since steps are mutated in place.
+        """
+        # Imported here so this module stays loadable on its own, as the benchmarks do
+        from .synthesis import note_name_to_key_number
+
+        count = len(self.steps)
+        notes = np.full(count, -1, dtype=np.int16)
+        velocities = np.zeros(count, dtype=np.float32)
+        durations = np.zeros(count, dtype=np.int32)
+        for i, step in enumerate(self.steps):
+            if step and step.note:
+                notes[i] = note_name_to_key_number(step.note)
+                velocities[i] = step.velocity
+                durations[i] = step.duration
+        return notes, velocities, durations
+
     def set_note(self, step_index: int, note: str, velocity: float = 1.0, duration: int = 1):
         """Adds or updates a note at a specific step."""
         if 0 <= step_index < len(self.steps):
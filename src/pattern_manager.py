@@ -1,21 +1,105 @@
+import gc
 import json
 import os
+import heapq
+from contextlib import contextmanager
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
+import msgspec
 from .music_structures import Pattern, NoteEvent
 
+# --- Library File Format ---
+# Items are stored as a single msgpack frame: a 4-byte big-endian payload length
+# followed by the payload. Legacy JSON files are still readable.
+LIBRARY_EXTENSION = '.msgpack'
+LEGACY_EXTENSION = '.json'
+FRAME_HEADER_SIZE = 4
+
+_encoder = msgspec.msgpack.Encoder()
+_decoder = msgspec.msgpack.Decoder(type=dict)
+
+@contextmanager
+def _gc_paused():
+    """Hold off the cyclic GC while decoding builds many short-lived containers.
+
+    Restores the previous state, so nested pauses (a scan reading many items) are safe.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
 class PatternManager:
     """Manages a library of saved patterns for reuse and arrangement."""
     
     def __init__(self, patterns_dir: str = "patterns"):
         self.patterns_dir = patterns_dir
         self.is_test_mode = patterns_dir.startswith("test_") or "test" in patterns_dir.lower()
+        self._index = None  # Item summaries grouped by type, newest first; built on first listing
+        self._index_mtimes = None  # Filename -> mtime the index reflects, to spot outside changes
         self._ensure_patterns_directory()
         
     def _ensure_patterns_directory(self):
         """Create patterns directory if it doesn't exist."""
         if not os.path.exists(self.patterns_dir):
             os.makedirs(self.patterns_dir)
+
+    def _item_stem(self, name: str, suffix: str = "") -> str:
+        """Convert an item name to its on-disk file stem."""
+        return f"{name.replace(' ', '_').lower()}{suffix}"
+
+    def _find_item(self, stem: str) -> Optional[str]:
+        """Return the path of a saved item, falling back to a legacy JSON file."""
+        for extension in (LIBRARY_EXTENSION, LEGACY_EXTENSION):
+            filepath = os.path.join(self.patterns_dir, stem + extension)
+            if os.path.exists(filepath):
+                return filepath
+        return None
+
+    def _write_item(self, stem: str, data: Dict):
+        """Write a library item as a length-prefixed msgpack frame."""
+        payload = _encoder.encode(data)
+        filepath = os.path.join(self.patterns_dir, stem + LIBRARY_EXTENSION)
+        with open(filepath, 'wb') as f:
+            f.write(len(payload).to_bytes(FRAME_HEADER_SIZE, 'big'))
+            f.write(payload)
+
+    def _read_item(self, filepath: str) -> Dict:
+        """Read a library item from either a msgpack frame or a legacy JSON file."""
+        if filepath.endswith(LEGACY_EXTENSION):
+            with open(filepath, 'r') as f, _gc_paused():
+                return json.load(f)
+
+        with open(filepath, 'rb') as f:
+            size = int.from_bytes(f.read(FRAME_HEADER_SIZE), 'big')
+            payload = f.read(size)
+        if len(payload) != size:
+            raise ValueError(f"truncated library file {filepath}")
+        with _gc_paused():
+            return _decoder.decode(payload)
+
+    def _library_files(self) -> Dict[str, int]:
+        """Map library filenames to their mtimes, skipping legacy JSON files shadowed by a msgpack file."""
+        if not os.path.exists(self.patterns_dir):
+            return {}
+        # scandir's entries carry their file type, so directories are skipped without a stat call
+        mtimes = {}
+        with os.scandir(self.patterns_dir) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        mtimes[entry.name] = entry.stat().st_mtime_ns
+                except OSError:
+                    continue  # Removed while we were scanning
+        stems = {f[:-len(LIBRARY_EXTENSION)] for f in mtimes if f.endswith(LIBRARY_EXTENSION)}
+        return {
+            f: mtime for f, mtime in mtimes.items()
+            if f.endswith(LIBRARY_EXTENSION)
+            or (f.endswith(LEGACY_EXTENSION) and f[:-len(LEGACY_EXTENSION)] not in stems)
+        }
             
     def save_pattern(self, pattern: Pattern, name: str, tags: List[str] = None, 
                     instrument_id: str = None) -> bool:
@@ -29,12 +113,9 @@ class PatternManager:
                 'pattern': pattern.to_dict()
             }
             
-            filename = f"{name.replace(' ', '_').lower()}.json"
-            filepath = os.path.join(self.patterns_dir, filename)
-            
-            with open(filepath, 'w') as f:
-                json.dump(pattern_data, f, indent=2)
-                
+            stem = self._item_stem(name)
+            self._write_item(stem, pattern_data)
+            self._add_to_index(stem, pattern_data)
             return True
         except Exception as e:
             print(f"Error saving pattern: {e}")
@@ -43,14 +124,11 @@ class PatternManager:
     def load_pattern(self, name: str) -> Optional[Tuple[Pattern, Dict]]:
         """Load a pattern from the library."""
         try:
-            filename = f"{name.replace(' ', '_').lower()}.json"
-            filepath = os.path.join(self.patterns_dir, filename)
-            
-            if not os.path.exists(filepath):
+            filepath = self._find_item(self._item_stem(name))
+            if not filepath:
                 return None
                 
-            with open(filepath, 'r') as f:
-                pattern_data = json.load(f)
+            pattern_data = self._read_item(filepath)
                 
             pattern = Pattern.from_dict(pattern_data['pattern'])
             metadata = {
@@ -67,42 +145,19 @@ class PatternManager:
             
     def list_patterns(self) -> List[Dict]:
         """List all patterns in the library with their metadata."""
-        patterns = []
-        
-        if not os.path.exists(self.patterns_dir):
-            return patterns
-            
-        for filename in os.listdir(self.patterns_dir):
-            if filename.endswith('.json'):
-                try:
-                    filepath = os.path.join(self.patterns_dir, filename)
-                    with open(filepath, 'r') as f:
-                        pattern_data = json.load(f)
-                        
-                    patterns.append({
-                        'filename': filename,
-                        'name': pattern_data['name'],
-                        'created_at': pattern_data['created_at'],
-                        'tags': pattern_data['tags'],
-                        'instrument_id': pattern_data.get('instrument_id'),
-                        'steps': len(pattern_data['pattern']['steps'])
-                    })
-                except Exception as e:
-                    print(f"Error reading pattern {filename}: {e}")
-                    continue
-                    
-        return sorted(patterns, key=lambda x: x['created_at'], reverse=True)
+        return list(self._get_index()['pattern'])
         
     def delete_pattern(self, name: str) -> bool:
         """Delete a pattern from the library."""
         try:
-            filename = f"{name.replace(' ', '_').lower()}.json"
-            filepath = os.path.join(self.patterns_dir, filename)
-            
-            if os.path.exists(filepath):
-                os.remove(filepath)
-                return True
-            return False
+            deleted = False
+            for extension in (LIBRARY_EXTENSION, LEGACY_EXTENSION):
+                filepath = os.path.join(self.patterns_dir, self._item_stem(name) + extension)
+                if os.path.exists(filepath):
+                    os.remove(filepath)
+                    deleted = True
+            self._remove_from_index(self._item_stem(name))
+            return deleted
         except Exception as e:
             print(f"Error deleting pattern: {e}")
             return False
@@ -189,12 +244,9 @@ class PatternManager:
                 'instruments': {inst_id: inst.to_dict() for inst_id, inst in instruments.items()}
             }
             
-            filename = f"{name.replace(' ', '_').lower()}_comp.json"
-            filepath = os.path.join(self.patterns_dir, filename)
-            
-            with open(filepath, 'w') as f:
-                json.dump(composition_data, f, indent=2)
-                
+            stem = self._item_stem(name, "_comp")
+            self._write_item(stem, composition_data)
+            self._add_to_index(stem, composition_data)
             return True
         except Exception as e:
             print(f"Error saving composition: {e}")
@@ -203,14 +255,11 @@ class PatternManager:
     def load_composition(self, name: str):
         """Load a full composition from the library."""
         try:
-            filename = f"{name.replace(' ', '_').lower()}_comp.json"
-            filepath = os.path.join(self.patterns_dir, filename)
-            
-            if not os.path.exists(filepath):
+            filepath = self._find_item(self._item_stem(name, "_comp"))
+            if not filepath:
                 return None
                 
-            with open(filepath, 'r') as f:
-                composition_data = json.load(f)
+            composition_data = self._read_item(filepath)
                 
             # Reconstruct composition and instruments
             from .music_structures import Composition
@@ -234,52 +283,111 @@ class PatternManager:
             print(f"Error loading composition: {e}")
             return None
             
-    def list_all_items(self) -> List[Dict]:
-        """List all patterns and compositions in the library."""
-        items = []
+    def export_item_json(self, filename: str) -> Optional[str]:
+        """Return a saved library item as indented JSON, for inspecting the binary files."""
+        try:
+            data = self._read_item(os.path.join(self.patterns_dir, filename))
+            return msgspec.json.format(msgspec.json.encode(data), indent=2).decode()
+        except Exception as e:
+            print(f"Error exporting {filename}: {e}")
+            return None
+
+    def _summarize_item(self, filename: str, data: Dict) -> Dict:
+        """Build the library listing entry for a stored item."""
+        # Determine if it's a pattern or composition
+        item_type = data.get('type', 'pattern')
         
-        if not os.path.exists(self.patterns_dir):
-            return items
+        if item_type == 'composition':
+            # For compositions, count tracks instead of steps
+            return {
+                'filename': filename,
+                'name': data['name'],
+                'created_at': data['created_at'],
+                'tags': data['tags'],
+                'type': 'composition',
+                'tracks': len(data['composition']['tracks']),
+                'bpm': data['composition'].get('bpm', 'N/A')
+            }
+        # Regular pattern
+        return {
+            'filename': filename,
+            'name': data['name'],
+            'created_at': data['created_at'],
+            'tags': data['tags'],
+            'type': 'pattern',
+            'instrument_id': data.get('instrument_id'),
+            'steps': len(data['pattern']['steps'])
+        }
+
+    def _build_index(self, filenames) -> Dict[str, List[Dict]]:
+        """Read the given library files and group item summaries by type, newest first."""
+        index = {'pattern': [], 'composition': []}
             
-        for filename in os.listdir(self.patterns_dir):
-            if filename.endswith('.json'):
+        # One GC pause for the whole scan rather than one per file
+        with _gc_paused():
+            for filename in filenames:
                 try:
                     filepath = os.path.join(self.patterns_dir, filename)
-                    with open(filepath, 'r') as f:
-                        data = json.load(f)
-                    
-                    # Determine if it's a pattern or composition
-                    item_type = data.get('type', 'pattern')
-                    
-                    if item_type == 'composition':
-                        # For compositions, count tracks instead of steps
-                        track_count = len(data['composition']['tracks'])
-                        items.append({
-                            'filename': filename,
-                            'name': data['name'],
-                            'created_at': data['created_at'],
-                            'tags': data['tags'],
-                            'type': 'composition',
-                            'tracks': track_count,
-                            'bpm': data['composition'].get('bpm', 'N/A')
-                        })
-                    else:
-                        # Regular pattern
-                        items.append({
-                            'filename': filename,
-                            'name': data['name'],
-                            'created_at': data['created_at'],
-                            'tags': data['tags'],
-                            'type': 'pattern',
-                            'instrument_id': data.get('instrument_id'),
-                            'steps': len(data['pattern']['steps'])
-                        })
-                        
+                    entry = self._summarize_item(filename, self._read_item(filepath))
                 except Exception as e:
                     print(f"Error reading file {filename}: {e}")
                     continue
-                    
-        return sorted(items, key=lambda x: x['created_at'], reverse=True)
+                index[entry['type']].append(entry)
+            
+        for entries in index.values():
+            entries.sort(key=lambda x: x['created_at'], reverse=True)
+        return index
+
+    def _get_index(self) -> Dict[str, List[Dict]]:
+        """Return the item index, rescanning the directory the first time and after outside changes."""
+        # Files added, removed or overwritten by another manager or tool change this mapping
+        mtimes = self._library_files()
+        if mtimes != self._index_mtimes:
+            self.refresh_index()
+        if self._index is None:
+            # Stat before reading, so a change made mid-scan triggers another rescan
+            self._index_mtimes = mtimes
+            self._index = self._build_index(mtimes)
+        return self._index
+
+    def _remove_from_index(self, stem: str):
+        """Drop any indexed entries stored under the given file stem."""
+        if self._index is None:
+            return
+        filenames = {stem + LIBRARY_EXTENSION, stem + LEGACY_EXTENSION}
+        for item_type, entries in self._index.items():
+            self._index[item_type] = [e for e in entries if e['filename'] not in filenames]
+        # Our own change is already reflected, so it shouldn't trigger a rescan
+        for filename in filenames:
+            self._index_mtimes.pop(filename, None)
+
+    def _add_to_index(self, stem: str, data: Dict):
+        """Record a just-saved item in the index, replacing any older entry."""
+        if self._index is None:
+            return  # The first listing will pick the file up from disk
+        self._remove_from_index(stem)
+        entry = self._summarize_item(stem + LIBRARY_EXTENSION, data)
+        self._index[entry['type']].insert(0, entry)  # Just saved, so it is the newest
+        filepath = os.path.join(self.patterns_dir, entry['filename'])
+        self._index_mtimes[entry['filename']] = os.stat(filepath).st_mtime_ns
+
+    def refresh_index(self):
+        """Forget the cached index so the next listing rescans the directory."""
+        self._index = None
+        self._index_mtimes = None
+
+    def list_items_by_type(self) -> Dict[str, List[Dict]]:
+        """List library items grouped into 'pattern' and 'composition', each newest first."""
+        return {item_type: list(entries) for item_type, entries in self._get_index().items()}
+            
+    def list_all_items(self) -> List[Dict]:
+        """List all patterns and compositions in the library."""
+        index = self._get_index()
+        # Both lists are already sorted, so a merge keeps the combined order
+        return list(heapq.merge(
+            index['pattern'], index['composition'],
+            key=lambda x: x['created_at'], reverse=True
+        ))
             
     def safe_cleanup_test_directory(self) -> bool:
         """Safely remove test pattern directory. Only works in test mode."""
@@ -289,6 +397,7 @@ class PatternManager:
             
         try:
             import shutil
+            self.refresh_index()
             if os.path.exists(self.patterns_dir):
                 shutil.rmtree(self.patterns_dir)
                 return True
@@ -1,4 +1,5 @@
 import time
+from time import perf_counter
 import bisect
 import threading
 import numpy as np
@@ -22,6 +23,19 @@ class Sequencer:
         self._current_frame = 0
         self._note_off_events = []  # List of (frame, event_id, (instrument, note_name)) tuples
         self._event_counter = 0  # Counter for unique event IDs
+        # Optional diagnostics hook, called from the audio thread after every block as
+        # on_buffer_callback(end_frame, active_note_count, processing_seconds). Keep it cheap.
+        self.on_buffer_callback = None
+        self._refresh_timing()
+
+    def _refresh_timing(self):
+        """Precompute the step length and loop length used by the audio callback.
+
+        Must be called (under the lock once playing) whenever tracks, patterns or BPM change.
+        """
+        self._step_duration_frames = int(self.composition.get_step_duration() * SAMPLE_RATE)
+        all_pattern_lengths = [len(p.steps) for t in self.composition.tracks for p in t.patterns if p.steps]
+        self._total_loop_steps = max(all_pattern_lengths) if all_pattern_lengths else 64
 
     def update_composition(self, new_composition, new_instruments):
         """Thread-safely update the composition and instruments."""
@@ -31,24 +45,38 @@ class Sequencer:
             self._current_frame = 0
             self._note_off_events.clear()
             self._event_counter = 0
+            self._refresh_timing()
             # Stop all notes on all instruments immediately to prevent stuck notes
             for instrument in self.instruments.values():
                 instrument.active_notes.clear()
 
+    def append_track(self, track, instrument=None):
+        """Thread-safely add a single track without resetting playback or other tracks' notes.
+
+        If given, instrument is registered for track.instrument_id under the same lock,
+        unless that id already has one; the audio callback iterates the instrument dict.
+        """
+        with self._lock:
+            if instrument is not None and track.instrument_id not in self.instruments:
+                self.instruments[track.instrument_id] = instrument
+            self.composition.tracks.append(track)
+            self._refresh_timing()
+
     def _audio_callback(self, outdata, frames, time, status):
         """The heart of the sequencer. Called by the audio driver to get samples."""
         # PERFORMANCE OPTIMIZATION: Removed all debug logging from audio callback
         # Debug logging was causing significant overhead in real-time audio processing
         
+        callback_start = perf_counter()
         with self._lock:
             start_frame = self._current_frame
             end_frame = start_frame + frames
-            step_duration_frames = int(self.composition.get_step_duration() * SAMPLE_RATE)
+            # Both are precomputed when the composition changes, not per block
+            step_duration_frames = self._step_duration_frames
+            total_loop_steps = self._total_loop_steps
 
             if step_duration_frames > 0:
                 # --- 1. Schedule Note On/Off Events for the current block ---
-                all_pattern_lengths = [len(p.steps) for t in self.composition.tracks for p in t.patterns if p.steps]
-                total_loop_steps = max(all_pattern_lengths) if all_pattern_lengths else 64
 
                 start_step = start_frame // step_duration_frames
                 end_step = end_frame // step_duration_frames
@@ -119,6 +147,20 @@ class Sequencer:
             outdata[:] = output_buffer
             self._current_frame = end_frame
 
+            # Gather the stats under the lock, but run the hook after releasing it
+            on_buffer_callback = self.on_buffer_callback
+            if on_buffer_callback is not None:
+                active_notes = sum(len(instrument.active_notes) for instrument in self.instruments.values())
+                processing_seconds = perf_counter() - callback_start
+
+        if on_buffer_callback is not None:
+            try:
+                on_buffer_callback(end_frame, active_notes, processing_seconds)
+            except Exception:
+                # A faulty diagnostics hook must not break the audio stream
+                # No logging to avoid audio callback overhead
+                pass
+
     def play(self):
         """Starts the sequencer playback."""
         if self.is_playing:
@@ -130,6 +172,7 @@ class Sequencer:
 
         self._current_frame = 0
         self._note_off_events.clear()
+        self._refresh_timing()
         self._stream = sd.OutputStream(
             samplerate=SAMPLE_RATE,
             channels=1,
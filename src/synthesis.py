@@ -1,11 +1,15 @@
 import numpy as np
 from scipy.signal import butter, lfilter
+from functools import lru_cache
 import time
 import logging
 
 # --- Configuration ---
 SAMPLE_RATE = 44100  # Samples per second
 
+# Shared generator for noise oscillators (PCG64, faster than the legacy global RNG)
+_noise_rng = np.random.default_rng()
+
 # --- Waveform Generators (Stateful) ---
 # These now act as generators, producing samples on demand.
 
@@ -73,7 +77,7 @@ def triangle_wave(frequency):
 def white_noise(frequency):
     """Generates continuous white noise. Frequency is ignored."""
     while True:
-        yield np.random.uniform(-1, 1)
+        yield _noise_rng.uniform(-1, 1)
 
 WAVEFORM_MAP = {
     'sine': sine_wave,
@@ -109,6 +113,26 @@ def note_to_freq(note_number):
 
 # --- Real-time Synthesis Components ---
 
+def waveform_from_phases(waveform, phases):
+    """Evaluates a waveform at the given phases (radians); works on arrays of any shape."""
+    if waveform == 'sine':
+        return np.sin(phases)
+    elif waveform == 'square':
+        return np.sign(np.sin(phases))
+    elif waveform == 'sawtooth':
+        # Normalize phase to [0, 1] and convert to sawtooth
+        normalized_phases = (phases / (2 * np.pi)) % 1.0
+        return 2.0 * normalized_phases - 1.0
+    elif waveform == 'triangle':
+        # Generate triangle from sawtooth
+        normalized_phases = (phases / (2 * np.pi)) % 1.0
+        sawtooth = 2.0 * normalized_phases - 1.0
+        return 2 * np.abs(sawtooth) - 1
+    elif waveform == 'noise':
+        return _noise_rng.uniform(-1, 1, np.shape(phases))
+    # Default to sine
+    return np.sin(phases)
+
 class ADSREnvelope:
     """Stateful ADSR envelope generator."""
     def __init__(self, attack, decay, sustain_level, release):
@@ -187,19 +211,17 @@ class ActiveNote:
     
     def _generate_envelope_block(self, num_samples):
         """Generate envelope values with true numpy vectorization."""
-        envelope_samples = np.zeros(num_samples)
         current_level = self.envelope.level
         current_state = self.envelope.state
         
         if current_state == 'off':
-            # All zeros, already initialized
-            return envelope_samples
+            return np.zeros(num_samples)
         elif current_state == 'sustain':
             # Constant sustain level
-            envelope_samples.fill(self.envelope.sustain_level)
-            return envelope_samples
+            return np.full(num_samples, self.envelope.sustain_level)
         
-        # For attack, decay, release - calculate vectorized ramps
+        # For attack, decay, release - calculate vectorized ramps; each builds its
+        # own array, so no zeroed buffer is allocated up front
         sample_indices = np.arange(num_samples)
         
         if current_state == 'attack':
@@ -231,6 +253,8 @@ class ActiveNote:
             self.envelope.level = envelope_samples[-1]
             if self.envelope.level <= 0.0:
                 self.envelope.state = 'off'
+        else:
+            envelope_samples = np.zeros(num_samples)
         
         return envelope_samples
     
@@ -242,33 +266,12 @@ class ActiveNote:
         # Calculate phase increment per sample
         phase_increment = (2 * np.pi * frequency) / SAMPLE_RATE
         
-        # Get current phase from oscillator state
-        if not hasattr(osc, 'phase'):
-            osc['phase'] = 0.0
-        
-        # Generate sample indices
+        # Generate sample indices, continuing from the phase stored on the oscillator
         sample_indices = np.arange(num_samples)
         phases = osc['phase'] + sample_indices * phase_increment
         
         # Generate waveform samples based on type
-        if waveform == 'sine':
-            samples = np.sin(phases)
-        elif waveform == 'square':
-            samples = np.sign(np.sin(phases))
-        elif waveform == 'sawtooth':
-            # Normalize phase to [0, 1] and convert to sawtooth
-            normalized_phases = (phases / (2 * np.pi)) % 1.0
-            samples = 2.0 * normalized_phases - 1.0
-        elif waveform == 'triangle':
-            # Generate triangle from sawtooth
-            normalized_phases = (phases / (2 * np.pi)) % 1.0
-            sawtooth = 2.0 * normalized_phases - 1.0
-            samples = 2 * np.abs(sawtooth) - 1
-        elif waveform == 'noise':
-            samples = np.random.uniform(-1, 1, num_samples)
-        else:
-            # Default to sine
-            samples = np.sin(phases)
+        samples = waveform_from_phases(waveform, phases)
         
         # Update oscillator phase for next block
         osc['phase'] = (osc['phase'] + num_samples * phase_increment) % (2 * np.pi)
@@ -307,6 +310,11 @@ class ActiveNote:
             )
         return wave * self.velocity
 
+@lru_cache(maxsize=256)
+def _filter_coefficients(order, normal_cutoff, btype):
+    """Designs a Butterworth filter once per (order, cutoff, type) instead of on every audio block."""
+    return butter(order, normal_cutoff, btype=btype, analog=False, fs=None)
+
 def apply_filter(signal, cutoff_hz, resonance_q, filter_type='lowpass', order=2):
     """Applies a filter to a signal."""
     nyquist = 0.5 * SAMPLE_RATE
@@ -316,11 +324,11 @@ def apply_filter(signal, cutoff_hz, resonance_q, filter_type='lowpass', order=2)
         return signal # Return original signal if cutoff is at or above Nyquist
 
     if filter_type == 'lowpass':
-        b, a = butter(order, normal_cutoff, btype='low', analog=False, fs=None)
+        b, a = _filter_coefficients(order, normal_cutoff, 'low')
         y = lfilter(b, a, signal)
         return y
     elif filter_type == 'highpass':
-        b, a = butter(order, normal_cutoff, btype='high', analog=False, fs=None)
+        b, a = _filter_coefficients(order, normal_cutoff, 'high')
         y = lfilter(b, a, signal)
         return y
     # Add other filter types like 'bandpass', 'bandstop' here in the future
@@ -347,6 +355,7 @@ class Instrument:
         self.filter_resonance_q = filter_resonance_q
 
         self.active_notes = []
+        self._mix_buffer = np.zeros(0)  # Reused by process(); grown on demand, single-threaded use only
 
     def to_dict(self):
         """Serializes the instrument to a dictionary."""
@@ -402,33 +411,87 @@ class Instrument:
             if note.note_name == note_name:
                 note.note_off()
 
-    def process(self, num_samples: int):
-        """Mixes all active notes into a single audio buffer."""
+    def _render_notes(self, notes, num_samples: int):
+        """Renders every note as one row of a (notes, samples) array and returns their sum.
+
+        Equivalent to summing ActiveNote.process over the notes, but each oscillator,
+        the envelope multiply and the per-note filter run once for all notes at a time.
+        """
+        count = len(notes)
+        sample_indices = np.arange(num_samples)
+        increments = (2 * np.pi / SAMPLE_RATE) * np.array([note.frequency for note in notes])
+        velocities = np.array([note.velocity for note in notes])
+
+        # Envelopes are per-note state machines, so they are still generated note by note
+        envelopes = np.empty((count, num_samples))
+        for row, note in enumerate(notes):
+            envelopes[row] = note._generate_envelope_block(num_samples)
+
+        # All notes were created from this instrument, so they share its oscillator layout
+        oscillators = notes[0].oscillators
+        mixed = np.zeros((count, num_samples))
+        for k, osc in enumerate(oscillators):
+            start_phases = np.array([note.oscillators[k]['phase'] for note in notes])
+            phases = start_phases[:, None] + sample_indices[None, :] * increments[:, None]
+            mixed += waveform_from_phases(osc['waveform'], phases) * osc['amplitude']
+            next_phases = (start_phases + num_samples * increments) % (2 * np.pi)
+            for note, phase in zip(notes, next_phases.tolist()):
+                note.oscillators[k]['phase'] = phase
+
+        # Normalize if necessary (e.g., if total amplitude > 1.0)
+        total_amplitude = sum(osc['amplitude'] for osc in oscillators)
+        if total_amplitude > 1.0:
+            mixed /= total_amplitude
+
+        wave = mixed * envelopes
+
+        # Per-note filter, applied along each row (lfilter filters the last axis)
+        if self.filter_type and self.filter_type != 'none':
+            wave = apply_filter(
+                wave,
+                cutoff_hz=self.filter_cutoff_hz,
+                resonance_q=self.filter_resonance_q,
+                filter_type=self.filter_type
+            )
+
+        wave *= velocities[:, None]
+        return wave.sum(axis=0)
+
+    def process_into(self, out: np.ndarray):
+        """Mixes all active notes into out, overwriting its contents; returns out.
+
+        Hosts that own a long-lived scratch buffer can render each block into it
+        with no per-call allocation.
+        """
         # PERFORMANCE OPTIMIZATION: Removed all debug logging from audio callback
         # Debug logging was causing 5.2ms+ overhead per 100 operations
         
-        output_buffer = np.zeros(num_samples)
-        # Process notes and remove inactive ones
-        notes_to_keep = []
-        
-        for note in self.active_notes:
-            if note.is_active():
-                try:
-                    note_output = note.process(num_samples)
-                    output_buffer += note_output
-                    notes_to_keep.append(note)
-                except Exception:
-                    # Remove problematic note by setting envelope to off state
-                    # No logging to avoid audio callback overhead
-                    note.envelope.state = 'off'
-        
-        self.active_notes = notes_to_keep
+        num_samples = len(out)
+        out.fill(0.0)
+        # Drop finished notes, then render the rest together
+        self.active_notes = [note for note in self.active_notes if note.is_active()]
+        if self.active_notes:
+            try:
+                np.add(out, self._render_notes(self.active_notes, num_samples), out=out)
+            except Exception:
+                # Fall back to rendering note by note so only the failing notes are dropped
+                out.fill(0.0)
+                notes_to_keep = []
+                for note in self.active_notes:
+                    try:
+                        np.add(out, note.process(num_samples), out=out)
+                        notes_to_keep.append(note)
+                    except Exception:
+                        # Remove problematic note by setting envelope to off state
+                        # No logging to avoid audio callback overhead
+                        note.envelope.state = 'off'
+                self.active_notes = notes_to_keep
         
         # Apply filter if specified
-        if self.filter_type and len(output_buffer) > 0:
+        if self.filter_type and num_samples > 0:
             try:
-                output_buffer = apply_filter(
-                    output_buffer, 
+                out[:] = apply_filter(
+                    out, 
                     self.filter_cutoff_hz, 
                     self.filter_resonance_q, 
                     self.filter_type
@@ -437,4 +500,18 @@ class Instrument:
                 # No logging to avoid audio callback overhead
                 pass
         
-        return output_buffer
+        return out
+
+    def process(self, num_samples: int):
+        """Mixes all active notes into a single audio buffer.
+
+        The returned array may be a view of a buffer reused on the next call,
+        so callers must consume (or copy) it before processing again. For the same
+        reason process() is not re-entrant: an instrument must only be rendered by
+        one thread at a time. The WAV export renders its own copies of the
+        instruments (MusicEngine.snapshot_for_export) rather than the live ones.
+        """
+        if len(self._mix_buffer) < num_samples:
+            # No need to zero it: process_into clears the block it renders into
+            self._mix_buffer = np.empty(num_samples)
+        return self.process_into(self._mix_buffer[:num_samples])
@@ -2,7 +2,13 @@ from textual.app import App, ComposeResult
 from textual.containers import Vertical, Horizontal
 from textual.widgets import Header, Footer, Input, RichLog, Static
 import logging
+import queue
+import hashlib
+from collections import Counter
+from functools import partial
+from logging.handlers import QueueHandler, QueueListener
 import json
+import msgspec
 from textual.worker import Worker
 
 # --- Project Imports ---
@@ -12,6 +18,28 @@ from .synthesis import Instrument, get_waveform_function, WAVEFORM_MAP
 from .llm_generator import LLMGenerator
 from .exporter import save_composition_to_json, render_composition_to_wav
 from .pattern_manager import PatternManager
+from .wire import WireComposition, composition_to_wire
+from .llm_cache import InMemoryLLMCache
+
+# Oscillator settings for instruments created when a loaded pattern has no matching instrument
+DEFAULT_OSCILLATORS = ({'waveform': 'sine', 'amplitude': 0.7},)
+
+# Maximum number of LLM responses kept for repeated prompts
+RESPONSE_CACHE_SIZE = 128
+
+# Pattern density tags, indexed by (active_steps > 4) + (active_steps >= 12)
+DENSITY_TAGS = ("sparse", "medium", "dense")
+
+# Heading of the track display panel
+TRACK_DISPLAY_HEADER = "[b]Current Composition:[/b]\n\n"
+
+def _step_summary(pattern: Pattern) -> str:
+    """Renders a pattern as one glyph per step: '_' for a rest, 'N' or 'N(duration)' for a note."""
+    # A list, not a generator: join materializes its input anyway, and this skips that copy
+    return ''.join([
+        (f"N({s.duration})" if s.duration > 1 else "N") if s and s.note else "_"
+        for s in pattern.steps
+    ])
 
 class MusicEngine:
     """Manages the musical state of the application using an LLM."""
@@ -22,22 +50,79 @@ class MusicEngine:
         self.sequencer = Sequencer(self.composition, self.instruments, logger=self.logger)
         self.llm_generator = LLMGenerator()
         self.pattern_manager = PatternManager()
-
-    def get_composition_as_dict(self):
-        """Serializes the current composition and instruments into a dictionary for the LLM."""
+        self.json_encoder = msgspec.json.Encoder(order="sorted")  # Canonical, byte-stable output
+        self.response_cache = InMemoryLLMCache(RESPONSE_CACHE_SIZE)
+        self._composition_dirty = True
+        # Context snapshot, rebuilt only after the composition is marked dirty
+        self._context_wire = None
+        self._context_json = None
+        self._context_hash = None
+        self.context_send_counts = Counter()  # context hash -> prompts sent with it this session
+
+    def get_composition_as_wire(self):
+        """Builds the compact wire structs for the current composition and instruments."""
         if not self.composition:
             return None # Return None if there's no composition
-
-        # Use the built-in to_dict methods for a consistent and reliable serialization
-        composition_dict = self.composition.to_dict()
-        composition_dict['instruments'] = [inst.to_dict() for inst in self.instruments.values()]
-        
-        return composition_dict
-
-    def update_composition_from_llm(self, music_data: dict) -> str:
-        """Updates the current composition based on data from the LLM."""
+        if not self.composition.tracks and not self.instruments:
+            return None # Nothing to describe yet
+        return composition_to_wire(self.composition, self.instruments)
+
+    def _get_context_wire(self):
+        """Returns the wire structs for the composition, rebuilding them only when dirty."""
+        if self._composition_dirty:
+            self._context_wire = self.get_composition_as_wire()
+            self._context_json = None
+            self._context_hash = None
+            self._composition_dirty = False
+        return self._context_wire
+
+    def encode_composition(self, wire: WireComposition) -> bytes:
+        """Encodes wire structs straight to JSON bytes without building dicts."""
+        return self.json_encoder.encode(wire)
+
+    def mark_composition_dirty(self) -> None:
+        """Flags the composition as changed so the LLM context is re-encoded on next use."""
+        self._composition_dirty = True
+
+    def get_context_json(self) -> bytes:
+        """Returns the composition as canonical JSON for the LLM, or b"" when there is nothing to describe."""
+        wire = self._get_context_wire()
+        if self._context_json is None:
+            # Instruments without tracks are still context, so only a wholly empty state is skipped
+            self._context_json = self.encode_composition(wire) if wire else b""
+        return self._context_json
+
+    def get_context_block(self) -> tuple:
+        """Returns the canonical context bytes and their blake2b hex digest, hashed once per snapshot."""
+        context_json = self.get_context_json()
+        if self._context_hash is None:
+            self._context_hash = hashlib.blake2b(context_json, digest_size=16).hexdigest()
+        return context_json, self._context_hash
+
+    def snapshot_for_export(self) -> tuple:
+        """Returns a copy of the composition and fresh instruments for an offline render.
+
+        The export renders on a worker thread, so it must not share the live instrument
+        dict or Instrument objects with the UI and the audio thread.
+        """
+        composition = Composition(bpm=self.composition.bpm, tracks=list(self.composition.tracks))
+        instruments = {
+            instrument_id: Instrument.from_dict(instrument.to_dict())
+            for instrument_id, instrument in self.instruments.items()
+        }
+        return composition, instruments
+
+    def clear_response_cache(self) -> int:
+        """Empties the LLM response cache and returns how many entries were dropped."""
+        return self.response_cache.clear()
+
+    def update_composition_from_llm(self, music_data: dict) -> tuple:
+        """Updates the current composition based on data from the LLM.
+
+        Returns (success, message); success is False when the data was rejected.
+        """
         if not music_data or 'tracks' not in music_data:
-            return "AI returned empty or invalid data."
+            return False, "AI returned empty or invalid data."
 
         try:
             # Use the robust from_dict methods to create the new composition and instruments
@@ -48,44 +133,48 @@ class MusicEngine:
             }
 
             # --- Log the structure of the new composition for debugging purposes ---
-            self.logger.info("--- New Composition Received from LLM ---")
-            self.logger.info(f"BPM: {new_composition.bpm}")
-            for i, track in enumerate(new_composition.tracks):
-                self.logger.info(f"  Track {i} (ID: {track.instrument_id}):")
-                self.logger.info(f"    Patterns: {len(track.patterns)}")
-                self.logger.info(f"    Sequence: {track.sequence}")
-                for j, pattern in enumerate(track.patterns):
-                    # Represent note and its duration
-                    step_summary = []
-                    for s in pattern.steps:
-                        if s and s.note:
-                            if s.duration > 1:
-                                step_summary.append(f"N({s.duration})")
-                            else:
-                                step_summary.append("N")
-                        else:
-                            step_summary.append("_")
-                    self.logger.info(f"      Pattern {j}: Steps: {len(pattern.steps)}")
-                    self.logger.info(f"      Pattern {j} Content: {''.join(step_summary)}")
-            self.logger.info("-----------------------------------------")
+            # Skip the walk entirely when INFO logging is disabled.
+            # All lines go out as a single record rather than one per line.
+            if self.logger.isEnabledFor(logging.INFO):
+                lines = ["--- New Composition Received from LLM ---", f"BPM: {new_composition.bpm}"]
+                for i, track in enumerate(new_composition.tracks):
+                    lines.append(f"  Track {i} (ID: {track.instrument_id}):")
+                    lines.append(f"    Patterns: {len(track.patterns)}")
+                    lines.append(f"    Sequence: {track.sequence}")
+                    for j, pattern in enumerate(track.patterns):
+                        lines.append(f"      Pattern {j}: Steps: {len(pattern.steps)}")
+                        try:
+                            summary = _step_summary(pattern)
+                        except Exception as e:
+                            # Log-only, so a malformed step mustn't reject the whole update
+                            summary = f"<unrenderable: {e}>"
+                        lines.append(f"      Pattern {j} Content: {summary}")
+                lines.append("-----------------------------------------")
+                self.logger.info("\n".join(lines))
 
             # Atomically update the MusicEngine's and the sequencer's state
+            # Replace rather than merge, so instruments dropped by the LLM don't linger in
+            # the context. Keep any old ones the new tracks still use but the LLM left out.
+            for track in new_composition.tracks:
+                if track.instrument_id not in new_instruments and track.instrument_id in self.instruments:
+                    new_instruments[track.instrument_id] = self.instruments[track.instrument_id]
             self.composition = new_composition
-            self.instruments.update(new_instruments)
+            self.instruments = new_instruments
             self.sequencer.update_composition(self.composition, self.instruments)
+            self.mark_composition_dirty()
 
             track_count = len(new_composition.tracks)
-            return f"Composition updated: {track_count} tracks, BPM: {new_composition.bpm}."
+            return True, f"Composition updated: {track_count} tracks, BPM: {new_composition.bpm}."
 
         except Exception as e:
             self.logger.error(f"Failed to update composition: {e}", exc_info=True)
-            return f"Error processing AI response: {e}"
+            return False, f"Error processing AI response: {e}"
 
 class VibeTrackerApp(App):
     """A Textual app for the Vibe Tracker."""
 
     TITLE = "Vibe Tracker - AI Music Studio"
-    SUB_TITLE = "Compose music with natural language | SPACE: Play/Pause | Ctrl-S: Save JSON | Ctrl-E: Export WAV | Ctrl-T: Save Pattern | Ctrl-L: Load Pattern | Ctrl-B: Library | Ctrl-X: Clear Project | Ctrl-D: Delete Track | Ctrl-Q: Quit"
+    SUB_TITLE = "Compose music with natural language | SPACE: Play/Pause | Ctrl-S: Save JSON | Ctrl-E: Export WAV | Ctrl-T: Save Pattern | Ctrl-L: Load Pattern | Ctrl-B: Library | Ctrl-X: Clear Project | Ctrl-D: Delete Track | Ctrl-R: Clear AI Cache | Ctrl-Q: Quit"
 
     BINDINGS = [
         ("ctrl+q", "quit", "Quit"),
@@ -97,6 +186,7 @@ class VibeTrackerApp(App):
         ("ctrl+b", "pattern_library", "Pattern Library"),
         ("ctrl+x", "clear_project", "Clear Project"),
         ("ctrl+d", "delete_track", "Delete Track"),
+        ("ctrl+r", "clear_cache", "Clear AI Cache"),
     ]
 
     def __init__(self):
@@ -105,6 +195,7 @@ class VibeTrackerApp(App):
         self.input_widget = Input(placeholder="Enter a prompt for the AI...", id="command_input")
         self.log_widget = RichLog(wrap=True, highlight=True, markup=True)
         self.track_display = Static("No tracks yet.", id="track_display")
+        self._last_render_key = None  # What the track display currently shows
 
     def compose(self) -> ComposeResult:
         yield Header()
@@ -119,17 +210,22 @@ class VibeTrackerApp(App):
     def on_mount(self) -> None:
         """Called when the app is mounted."""
         # --- Setup Logging ---
+        # Records are only enqueued here; the listener thread does the file I/O
+        # so large log messages never block the event loop.
         self.logger = logging.getLogger(__name__)
+        log_queue = queue.SimpleQueue()
         handler = logging.FileHandler("vibe_tracker.log", mode='w')
         formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
         handler.setFormatter(formatter)
-        self.logger.addHandler(handler)
+        self.log_listener = QueueListener(log_queue, handler)
+        self.log_listener.start()
+        self.logger.addHandler(QueueHandler(log_queue))
         self.logger.setLevel(logging.DEBUG)
         self.logger.info("Application starting up...")
 
         self.music_engine = MusicEngine(self.logger)
         self.log_widget.write("Welcome! I'm your AI music assistant. Give me a command to start.")
-        self.query_one("#command_input").focus()
+        self.input_widget.focus()
 
     def on_input_submitted(self, event: Input.Submitted) -> None:
         value = event.value
@@ -142,7 +238,10 @@ class VibeTrackerApp(App):
             self.run_worker(self.worker_save_json(value))
             self.set_input_mode('prompt')
         elif self.input_mode == 'export_wav':
-            self.run_worker(self.worker_export_wav(value))
+            # Rendering is CPU-bound, so keep it off the event loop. The snapshot is taken
+            # here on the UI thread so later edits can't change what the worker renders.
+            composition, instruments = self.music_engine.snapshot_for_export()
+            self.run_worker(partial(self.worker_export_wav, value, composition, instruments), thread=True)
             self.set_input_mode('prompt')
         elif self.input_mode == 'save_pattern':
             self.run_worker(self.worker_save_pattern(value))
@@ -175,21 +274,37 @@ class VibeTrackerApp(App):
 
     async def generate_music(self, prompt: str) -> None:
         """Worker function to call the LLM and process the response, now context-aware and non-blocking."""
-        # 1. Get the current state of the music as a dictionary.
-        current_composition_dict = self.music_engine.get_composition_as_dict()
+        # 1. Get the current state of the music as canonical JSON; it is only
+        # re-encoded after the composition changes, so repeat turns send identical bytes.
+        context_json, context_hash = self.music_engine.get_context_block()
 
-        # Log the context being sent to the LLM
-        if current_composition_dict:
-            self.logger.info(f"\n--- CONTEXT SENT TO LLM ---\n{json.dumps(current_composition_dict, indent=2)}\n---------------------------")
+        # Log the context being sent to the LLM, in the same one-line form it is sent in
+        if context_json:
+            self.logger.info(f"\n--- CONTEXT SENT TO LLM ---\n{context_json.decode()}\n---------------------------")
         else:
             self.logger.info("--- CONTEXT SENT TO LLM: Empty composition ---")
 
-        # 2. Call the LLM with the user prompt and the current composition as context.
-        music_data, error = self.music_engine.llm_generator.generate_music_from_prompt(
-            prompt,
-            context_composition=current_composition_dict
+        # A context sent more than once is a byte-identical prompt prefix the provider can reuse
+        counts = self.music_engine.context_send_counts
+        counts[context_hash] += 1
+        self.logger.info(
+            f"Context ctx={context_hash[:8]} sent {counts[context_hash]} time(s); "
+            f"{sum(counts.values()) - len(counts)} of {sum(counts.values())} prompts this session reused a context"
         )
 
+        # 2. Reuse a previous response for the same prompt and composition, otherwise
+        # call the LLM with the user prompt and the current composition as context.
+        music_data = self.music_engine.response_cache.lookup(prompt, context_hash)
+        if music_data is not None:
+            error = None
+            self.logger.info("--- LLM response served from cache ---")
+        else:
+            # Awaited, so the UI keeps responding while the request is in flight
+            music_data, error = await self.music_engine.llm_generator.agenerate_music_from_prompt(
+                prompt,
+                context_json=context_json.decode() or None
+            )
+
         # 3. Process the response.
         if error:
             self.log_widget.write(f"AI: Sorry, an error occurred: {error}")
@@ -199,7 +314,10 @@ class VibeTrackerApp(App):
             self.logger.info(f"\n--- DATA RECEIVED FROM LLM ---\n{json.dumps(music_data, indent=2)}\n------------------------------")
             
             # The `update_composition_from_llm` method will atomically update the live sequencer.
-            response_message = self.music_engine.update_composition_from_llm(music_data)
+            applied, response_message = self.music_engine.update_composition_from_llm(music_data)
+            # Only cache replies that produced a valid composition, so a bad one isn't replayed
+            if applied:
+                self.music_engine.response_cache.update(prompt, context_hash, music_data)
             self.log_widget.write(f"AI: {response_message}")
             self.update_track_display()
 
@@ -237,31 +355,39 @@ class VibeTrackerApp(App):
             return
         self.set_input_mode('export_wav', "Enter filename for WAV (e.g., 'my_song.wav'):")
 
-    async def worker_export_wav(self, filepath: str):
-        self.log_widget.write(f"Rendering to {filepath}... (this may take a moment)")
-        error = render_composition_to_wav(
-            self.music_engine.composition, self.music_engine.instruments, filepath
-        )
+    def worker_export_wav(self, filepath: str, composition: Composition, instruments: dict):
+        """Thread worker that renders a snapshot to WAV; UI updates go through call_from_thread."""
+        self.call_from_thread(self.log_widget.write, f"Rendering to {filepath}... (this may take a moment)")
+        error = render_composition_to_wav(composition, instruments, filepath)
         if error:
-            self.log_widget.write(f"[bold red]Error exporting WAV:[/] {error}")
+            self.call_from_thread(self.log_widget.write, f"[bold red]Error exporting WAV:[/] {error}")
         else:
-            self.log_widget.write(f"[bold green]Successfully exported to {filepath}[/]")
+            self.call_from_thread(self.log_widget.write, f"[bold green]Successfully exported to {filepath}[/]")
 
     def update_track_display(self) -> None:
         """Updates the track display widget with the current list of tracks."""
-        track_display = self.query_one("#track_display", Static)
-        tracks = self.music_engine.composition.tracks
+        track_display = self.track_display  # Held since __init__, no DOM query needed
+        composition = self.music_engine.composition
+        tracks = composition.tracks
+
+        # Skip the widget refresh when the display would show exactly what it already does
+        render_key = (composition.bpm, tuple(track.instrument_id for track in tracks))
+        if render_key == self._last_render_key:
+            return
+        self._last_render_key = render_key
+
         if not tracks:
             track_display.update("No tracks yet.")
             return
 
-        display_text = "[b]Current Composition:[/b]\n\n"
-        display_text += f"[b]BPM:[/b] {self.music_engine.composition.bpm}\n\n"
-        display_text += "[b]Tracks:[/b]\n"
-        for i, track in enumerate(tracks):
-            display_text += f"- Track {i}: {track.instrument_id}\n"
+        parts = [
+            TRACK_DISPLAY_HEADER,
+            f"[b]BPM:[/b] {composition.bpm}\n\n",
+            "[b]Tracks:[/b]\n",
+        ]
+        parts.extend(f"- Track {i}: {track.instrument_id}\n" for i, track in enumerate(tracks))
         
-        track_display.update(display_text)
+        track_display.update("".join(parts))
 
     def action_save_pattern(self) -> None:
         """Save current music to library."""
@@ -284,48 +410,51 @@ class VibeTrackerApp(App):
             self.log_widget.write("Library is empty. Use Ctrl+T to save music first.")
             return
             
-        self.log_widget.write("Available items to load:")
+        # Build the preview first and write it once to avoid a refresh per line
+        lines = ["Available items to load:"]
         for item in items[:5]:  # Show first 5 items
             if item['type'] == 'composition':
-                self.log_widget.write(f"• {item['name']} (composition, {item['tracks']} tracks)")
+                lines.append(f"• {item['name']} (composition, {item['tracks']} tracks)")
             else:
-                self.log_widget.write(f"• {item['name']} (pattern, {item.get('instrument_id', 'unknown')})")
+                lines.append(f"• {item['name']} (pattern, {item.get('instrument_id', 'unknown')})")
         if len(items) > 5:
-            self.log_widget.write(f"... and {len(items) - 5} more (use Ctrl+B to see all)")
+            lines.append(f"... and {len(items) - 5} more (use Ctrl+B to see all)")
+        self.log_widget.write("\n".join(lines))
             
         self.set_input_mode('load_auto', "Enter name to load:")
 
     def action_pattern_library(self) -> None:
         """Show pattern and composition library browser."""
-        items = self.music_engine.pattern_manager.list_all_items()
-        if not items:
+        # Items come pre-grouped by type and sorted newest first
+        items = self.music_engine.pattern_manager.list_items_by_type()
+        patterns = items['pattern']
+        compositions = items['composition']
+        if not patterns and not compositions:
             self.log_widget.write("Library is empty. Use Ctrl+T to save patterns or compositions.")
             return
             
-        self.log_widget.write("[bold]Pattern & Composition Library:[/bold]")
-        
-        # Group by type for better display
-        patterns = [item for item in items if item['type'] == 'pattern']
-        compositions = [item for item in items if item['type'] == 'composition']
+        # Build the whole listing first and write it once to avoid a refresh per line
+        lines = ["[bold]Pattern & Composition Library:[/bold]"]
         
         if compositions:
-            self.log_widget.write("\n[bold cyan]🎵 Compositions:[/bold cyan]")
+            lines.append("\n[bold cyan]🎵 Compositions:[/bold cyan]")
             for comp in compositions:
                 tags_str = ", ".join(comp['tags']) if comp['tags'] else "No tags"
-                self.log_widget.write(
+                lines.append(
                     f"• {comp['name']} ({comp['tracks']} tracks, {comp['bpm']} BPM) - {tags_str} - {comp['created_at'][:10]}"
                 )
         
         if patterns:
-            self.log_widget.write("\n[bold green]🎼 Individual Patterns:[/bold green]")
+            lines.append("\n[bold green]🎼 Individual Patterns:[/bold green]")
             for pattern in patterns:
                 tags_str = ", ".join(pattern['tags']) if pattern['tags'] else "No tags"
                 instrument = pattern.get('instrument_id', 'unknown')
-                self.log_widget.write(
+                lines.append(
                     f"• {pattern['name']} ({pattern['steps']} steps, {instrument}) - {tags_str} - {pattern['created_at'][:10]}"
                 )
         
-        self.log_widget.write("\nUse Ctrl+L to load a pattern or composition.")
+        lines.append("\nUse Ctrl+L to load a pattern or composition.")
+        self.log_widget.write("\n".join(lines))
 
     async def worker_save_pattern(self, pattern_name: str):
         """Worker to save all patterns from all tracks to library."""
@@ -335,11 +464,12 @@ class VibeTrackerApp(App):
         
         saved_count = 0
         failed_count = 0
+        lines = []  # Collected and written once at the end
         
         # Save patterns from all tracks
         for track_idx, track in enumerate(self.music_engine.composition.tracks):
             if not track.patterns:
-                self.log_widget.write(f"Track {track_idx} ({track.instrument_id}) has no patterns, skipping.")
+                lines.append(f"Track {track_idx} ({track.instrument_id}) has no patterns, skipping.")
                 continue
                 
             # Save the first pattern from each track
@@ -359,12 +489,7 @@ class VibeTrackerApp(App):
             
             # Count active steps for additional tag info
             active_steps = sum(1 for step in pattern.steps if step and step.note)
-            if active_steps <= 4:
-                tags.append("sparse")
-            elif active_steps >= 12:
-                tags.append("dense")
-            else:
-                tags.append("medium")
+            tags.append(DENSITY_TAGS[(active_steps > 4) + (active_steps >= 12)])
             
             # Add multi-track tag if applicable
             if len(self.music_engine.composition.tracks) > 1:
@@ -377,60 +502,73 @@ class VibeTrackerApp(App):
             if success:
                 saved_count += 1
                 tags_str = ", ".join(tags) if tags else "no tags"
-                self.log_widget.write(f"✓ Saved '{track_pattern_name}' with tags: {tags_str}")
+                lines.append(f"✓ Saved '{track_pattern_name}' with tags: {tags_str}")
             else:
                 failed_count += 1
-                self.log_widget.write(f"✗ Failed to save '{track_pattern_name}'")
+                lines.append(f"✗ Failed to save '{track_pattern_name}'")
         
         # Summary message
         if saved_count > 0:
-            self.log_widget.write(f"[bold green]Successfully saved {saved_count} pattern(s)![/bold green]")
+            lines.append(f"[bold green]Successfully saved {saved_count} pattern(s)![/bold green]")
         if failed_count > 0:
-            self.log_widget.write(f"[bold red]Failed to save {failed_count} pattern(s)[/bold red]")
+            lines.append(f"[bold red]Failed to save {failed_count} pattern(s)[/bold red]")
+        if lines:
+            self.log_widget.write("\n".join(lines))
+
+    def _default_instrument(self, instrument_id: str):
+        """Returns a new default instrument for instrument_id, or None if the engine has one."""
+        if instrument_id in self.music_engine.instruments:
+            return None
+        self.log_widget.write(f"Created default instrument for '{instrument_id}'")
+        return Instrument(
+            name=instrument_id,
+            oscillators=[dict(osc) for osc in DEFAULT_OSCILLATORS],
+            attack=0.01,
+            decay=0.1,
+            sustain_level=0.7,
+            release=0.2
+        )
 
-    async def worker_load_pattern(self, pattern_name: str):
-        """Worker to load pattern from library."""
-        result = self.music_engine.pattern_manager.load_pattern(pattern_name)
-        
-        if not result:
-            self.log_widget.write(f"[bold red]Pattern '{pattern_name}' not found[/bold red]")
-            return
-            
-        pattern, metadata = result
-        instrument_id = metadata.get('instrument_id', 'default')
-        
+    def _apply_pattern(self, pattern: Pattern, instrument_id: str, origin_name: str) -> None:
+        """Appends a loaded library pattern to the composition as a new track."""
         # Create a new track with the loaded pattern
-        from .music_structures import Track
         new_track = Track(instrument_id=instrument_id)
         new_track.patterns = [pattern]
         new_track.sequence = [0]  # Play the loaded pattern
         
         # Ensure the instrument exists - create a default one if needed
-        if instrument_id not in self.music_engine.instruments:
-            from .synthesis import Instrument
-            # Create a default instrument for the loaded pattern
-            default_instrument = Instrument(
-                name=instrument_id,
-                oscillators=[{'waveform': 'sine', 'amplitude': 0.7}],
-                attack=0.01,
-                decay=0.1,
-                sustain_level=0.7,
-                release=0.2
+        instrument = self._default_instrument(instrument_id)
+        
+        # Add to composition. When the sequencer is already playing this composition,
+        # register just the new track and its instrument, under the sequencer's lock,
+        # instead of rebinding everything.
+        sequencer = self.music_engine.sequencer
+        if (sequencer.composition is self.music_engine.composition
+                and sequencer.instruments is self.music_engine.instruments):
+            sequencer.append_track(new_track, instrument)
+        else:
+            if instrument is not None:
+                self.music_engine.instruments[instrument_id] = instrument
+            self.music_engine.composition.tracks.append(new_track)
+            sequencer.update_composition(
+                self.music_engine.composition, self.music_engine.instruments
             )
-            self.music_engine.instruments[instrument_id] = default_instrument
-            self.log_widget.write(f"Created default instrument for '{instrument_id}'")
-        
-        # Add to composition
-        self.music_engine.composition.tracks.append(new_track)
-        
-        # Update sequencer
-        self.music_engine.sequencer.update_composition(
-            self.music_engine.composition, self.music_engine.instruments
-        )
+        self.music_engine.mark_composition_dirty()
         
-        self.log_widget.write(f"[bold green]Pattern '{pattern_name}' loaded successfully![/bold green]")
+        self.log_widget.write(f"[bold green]Pattern '{origin_name}' loaded successfully![/bold green]")
         self.update_track_display()
 
+    async def worker_load_pattern(self, pattern_name: str):
+        """Worker to load pattern from library."""
+        result = self.music_engine.pattern_manager.load_pattern(pattern_name)
+        
+        if not result:
+            self.log_widget.write(f"[bold red]Pattern '{pattern_name}' not found[/bold red]")
+            return
+            
+        pattern, metadata = result
+        self._apply_pattern(pattern, metadata.get('instrument_id', 'default'), pattern_name)
+
     async def worker_load_auto(self, name: str):
         """Universal worker to load any type of music (pattern or composition)."""
         # First try to load as composition
@@ -446,6 +584,7 @@ class VibeTrackerApp(App):
             self.music_engine.sequencer.update_composition(
                 self.music_engine.composition, self.music_engine.instruments
             )
+            self.music_engine.mark_composition_dirty()
             
             track_count = len(composition.tracks)
             self.log_widget.write(f"[bold green]Composition '{name}' loaded successfully![/bold green]")
@@ -457,38 +596,7 @@ class VibeTrackerApp(App):
         pattern_result = self.music_engine.pattern_manager.load_pattern(name)
         if pattern_result:
             pattern, metadata = pattern_result
-            instrument_id = metadata.get('instrument_id', 'default')
-            
-            # Create a new track with the loaded pattern
-            from .music_structures import Track
-            new_track = Track(instrument_id=instrument_id)
-            new_track.patterns = [pattern]
-            new_track.sequence = [0]
-            
-            # Ensure the instrument exists
-            if instrument_id not in self.music_engine.instruments:
-                from .synthesis import Instrument
-                default_instrument = Instrument(
-                    name=instrument_id,
-                    oscillators=[{'waveform': 'sine', 'amplitude': 0.7}],
-                    attack=0.01,
-                    decay=0.1,
-                    sustain_level=0.7,
-                    release=0.2
-                )
-                self.music_engine.instruments[instrument_id] = default_instrument
-                self.log_widget.write(f"Created default instrument for '{instrument_id}'")
-            
-            # Add to composition
-            self.music_engine.composition.tracks.append(new_track)
-            
-            # Update sequencer
-            self.music_engine.sequencer.update_composition(
-                self.music_engine.composition, self.music_engine.instruments
-            )
-            
-            self.log_widget.write(f"[bold green]Pattern '{name}' loaded successfully![/bold green]")
-            self.update_track_display()
+            self._apply_pattern(pattern, metadata.get('instrument_id', 'default'), name)
             return
         
         # Nothing found
@@ -547,6 +655,7 @@ class VibeTrackerApp(App):
         self.music_engine.sequencer.update_composition(
             self.music_engine.composition, self.music_engine.instruments
         )
+        self.music_engine.mark_composition_dirty()
         
         track_count = len(composition.tracks)
         self.log_widget.write(f"[bold green]Composition '{composition_name}' loaded successfully![/bold green]")
@@ -571,6 +680,7 @@ class VibeTrackerApp(App):
         self.music_engine.sequencer.update_composition(
             self.music_engine.composition, self.music_engine.instruments
         )
+        self.music_engine.mark_composition_dirty()
         
         # Update display
         self.update_track_display()
@@ -625,17 +735,27 @@ class VibeTrackerApp(App):
         self.music_engine.sequencer.update_composition(
             self.music_engine.composition, self.music_engine.instruments
         )
+        self.music_engine.mark_composition_dirty()
         
         # Update display
         self.update_track_display()
         
         self.log_widget.write(f"[bold green]Track {track_index} ({instrument_id}) deleted successfully![/bold green]")
 
+    def action_clear_cache(self) -> None:
+        """Forget cached LLM responses so the next prompt always reaches the AI."""
+        count = self.music_engine.clear_response_cache()
+        self.log_widget.write(f"Cleared {count} cached AI response(s).")
+
     def action_quit(self) -> None:
         """Cleanly exit the application."""
         self.music_engine.sequencer.stop()
         self.exit()
 
+    def on_unmount(self) -> None:
+        """Called on every shutdown path, not just the quit action."""
+        self.log_listener.stop()  # Flushes any queued log records
+
 if __name__ == "__main__":
     app = VibeTrackerApp()
     app.run()
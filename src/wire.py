@@ -0,0 +1,78 @@
+from typing import Dict, List, Optional
+
+import msgspec
+
+from .music_structures import Composition
+
+# --- Wire Format ---
+# Compact mirrors of the JSON context sent to the LLM. They are filled straight
+# from the live objects, so no intermediate dict tree is built before encoding.
+
+class WireNote(msgspec.Struct, omit_defaults=True):
+    """A note as it appears in a track's 'notes' list."""
+    note: str
+    velocity: float
+    step: int
+    duration: int = 1  # Omitted when 1, matching NoteEvent.to_dict
+
+class WireTrack(msgspec.Struct):
+    """A track in the LLM's format: an instrument name and its notes."""
+    instrument_name: str
+    notes: List[WireNote]
+
+class WireInstrument(msgspec.Struct):
+    """The serializable settings of an Instrument."""
+    name: str
+    oscillators: List[dict]
+    attack: float
+    decay: float
+    sustain_level: float
+    release: float
+    filter_type: Optional[str]
+    filter_cutoff_hz: float
+    filter_resonance_q: float
+
+class WireComposition(msgspec.Struct):
+    """The full composition context: tempo, tracks and instruments."""
+    bpm: int
+    tracks: List[WireTrack]
+    instruments: List[WireInstrument]
+
+def composition_to_wire(composition: Composition, instruments: Dict) -> WireComposition:
+    """Builds the wire representation of a composition and its instruments.
+
+    Tracks and instruments are ordered by name so that the same composition
+    always encodes to the same bytes, whatever order the LLM returned them in.
+    """
+    tracks = []
+    # sorted() is stable, so tracks sharing an instrument keep their relative order
+    for track in sorted(composition.tracks, key=lambda t: t.instrument_id):
+        notes = []
+        # Only the first pattern is sent, as in Track.to_dict
+        if track.patterns:
+            for step_index, note_event in enumerate(track.patterns[0].steps):
+                if note_event and note_event.note:
+                    notes.append(WireNote(
+                        note=note_event.note,
+                        velocity=note_event.velocity,
+                        step=step_index,
+                        duration=note_event.duration
+                    ))
+        tracks.append(WireTrack(instrument_name=track.instrument_id, notes=notes))
+
+    wire_instruments = [
+        WireInstrument(
+            name=inst.name,
+            oscillators=inst.oscillators,
+            attack=inst.attack,
+            decay=inst.decay,
+            sustain_level=inst.sustain_level,
+            release=inst.release,
+            filter_type=inst.filter_type,
+            filter_cutoff_hz=inst.filter_cutoff_hz,
+            filter_resonance_q=inst.filter_resonance_q
+        )
+        for inst in sorted(instruments.values(), key=lambda i: i.name)
+    ]
+
+    return WireComposition(bpm=composition.bpm, tracks=tracks, instruments=wire_instruments)
@@ -8,14 +8,19 @@ import sys
 import os
 import time
 import logging
+import threading
+import numpy as np
 
 # Add src directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 from src.music_structures import Pattern, Track, Composition, NoteEvent
-from src.synthesis import Instrument
+from src.synthesis import Instrument, SAMPLE_RATE
 from src.sequencer import Sequencer
 
+TEST_DURATION_SECONDS = 10
+MAX_RECORDED_BLOCKS = 100_000
+
 def setup_debug_logging():
     """Setup detailed debug logging."""
     logging.basicConfig(
@@ -99,29 +104,49 @@ def test_multitrack_performance(num_tracks):
         logger.info("Creating sequencer...")
         sequencer = Sequencer(composition, all_instruments, logger=logger)
         
+        # Record every audio block from the sequencer's own callback instead of
+        # polling once a second; the results are analyzed after playback stops.
+        block_seconds = np.empty(MAX_RECORDED_BLOCKS, dtype=np.float64)
+        block_notes = np.empty(MAX_RECORDED_BLOCKS, dtype=np.int32)
+        block_count = 0
+        finished = threading.Event()
+        end_frame_target = TEST_DURATION_SECONDS * SAMPLE_RATE
+
+        def record_block(end_frame, active_notes, seconds):
+            nonlocal block_count
+            if block_count < MAX_RECORDED_BLOCKS:
+                block_seconds[block_count] = seconds
+                block_notes[block_count] = active_notes
+                block_count += 1
+            if end_frame >= end_frame_target:
+                finished.set()
+
+        sequencer.on_buffer_callback = record_block
+        
         # Start playback
         logger.info("Starting playback...")
         start_time = time.time()
         sequencer.play()
         
-        # Monitor for 10 seconds
-        for second in range(10):
-            time.sleep(1)
-            elapsed = time.time() - start_time
-            
-            if not sequencer.is_playing:
-                logger.error(f"SEQUENCER STOPPED at {elapsed:.1f}s!")
-                break
-                
-            # Check active notes count across all instruments
-            total_active_notes = sum(len(inst.active_notes) for inst in all_instruments.values())
-            logger.info(f"Second {second+1}: Still playing, total active notes: {total_active_notes}")
-            
-            if total_active_notes > 50:  # Warning threshold
-                logger.warning(f"High note count detected: {total_active_notes}")
+        # Wait for the audio thread to render the test duration (with slack for a stalled stream)
+        if not finished.wait(timeout=TEST_DURATION_SECONDS * 2):
+            logger.error(f"SEQUENCER STALLED: only {block_count} blocks rendered in {time.time() - start_time:.1f}s!")
         
         logger.info("Stopping sequencer...")
         sequencer.stop()
+        sequencer.on_buffer_callback = None
+        
+        if block_count:
+            seconds = block_seconds[:block_count]
+            notes = block_notes[:block_count]
+            slowest = int(np.argmax(seconds))
+            logger.info(
+                f"Blocks: {block_count}, mean callback: {seconds.mean() * 1000:.3f}ms, "
+                f"max callback: {seconds[slowest] * 1000:.3f}ms with {notes[slowest]} active notes, "
+                f"peak active notes: {notes.max()}"
+            )
+            if notes.max() > 50:  # Warning threshold
+                logger.warning(f"High note count detected: {notes.max()}")
         
         total_time = time.time() - start_time
         logger.info(f"=== TEST COMPLETED: {num_tracks} tracks ran for {total_time:.1f}s ===")
@@ -8,6 +8,7 @@ import sys
 import os
 import time
 import logging
+import numpy as np
 
 # Add src directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
@@ -59,7 +60,10 @@ def create_test_composition():
     test_pattern.steps[8] = NoteEvent(note='G4', velocity=0.6, duration=2)
     test_pattern.steps[12] = NoteEvent(note='C5', velocity=0.5, duration=2)
     
-    logger.info(f"Created pattern with {len([s for s in test_pattern.steps if s])} notes")
+    notes, velocities, durations = test_pattern.to_soa()
+    note_steps = np.flatnonzero(notes >= 0)
+    logger.info(f"Created pattern with {note_steps.size} notes at steps {note_steps.tolist()}, "
+                f"key numbers {notes[note_steps].tolist()}, durations {durations[note_steps].tolist()}")
 
     # Create track
     test_track = Track(instrument_id='test_synth', patterns=[test_pattern], sequence=[0])
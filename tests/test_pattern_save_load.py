@@ -10,7 +10,13 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from src.music_structures import Composition, Track, Pattern, NoteEvent
 from src.synthesis import Instrument
 from src.pattern_manager import PatternManager
-import json
+import msgspec
+
+_json_encoder = msgspec.json.Encoder()
+
+# Output separators, built once
+SEPARATOR = "=" * 50
+SECTION_BREAK = "\n" + SEPARATOR
 
 def create_test_composition():
     """Create a test composition with a simple pattern."""
@@ -44,12 +50,16 @@ def create_test_composition():
 
 def print_pattern_details(pattern, title):
     """Print detailed pattern information."""
+    # Build the dict once and derive everything printed below from it
+    pattern_dict = pattern.to_dict()
+    steps = pattern_dict['steps']
     print(f"\n=== {title} ===")
-    print(f"Pattern steps: {len(pattern.steps)}")
-    active_steps = []
-    for i, step in enumerate(pattern.steps):
-        if step and step.note:
-            active_steps.append(f"Step {i}: {step.note} (vel={step.velocity}, dur={step.duration})")
+    print(f"Pattern steps: {len(steps)}")
+    active_steps = [
+        f"Step {i}: {step['note']} (vel={step['velocity']}, dur={step.get('duration', 1)})"
+        for i, step in enumerate(steps)
+        if step and step['note']
+    ]
     
     if active_steps:
         print("Active steps:")
@@ -58,11 +68,12 @@ def print_pattern_details(pattern, title):
     else:
         print("No active steps found!")
     
-    print(f"Pattern dict: {json.dumps(pattern.to_dict(), indent=2)}")
+    pattern_json = msgspec.json.format(_json_encoder.encode(pattern_dict), indent=2)
+    print(f"Pattern dict: {pattern_json.decode()}")
 
 def main():
     print("Testing Pattern Save/Load Functionality")
-    print("=" * 50)
+    print(SEPARATOR)
     
     # Create test data
     composition, instruments = create_test_composition()
@@ -76,7 +87,7 @@ def main():
     pm = PatternManager("test_patterns")
     
     # Save pattern
-    print("\n" + "="*50)
+    print(SECTION_BREAK)
     print("SAVING PATTERN...")
     success = pm.save_pattern(
         original_pattern, 
@@ -87,7 +98,7 @@ def main():
     print(f"Save success: {success}")
     
     # Load pattern
-    print("\n" + "="*50)
+    print(SECTION_BREAK)
     print("LOADING PATTERN...")
     result = pm.load_pattern("test_kick")
     
@@ -98,7 +109,7 @@ def main():
         print_pattern_details(loaded_pattern, "LOADED PATTERN")
         
         # Compare patterns
-        print("\n" + "="*50)
+        print(SECTION_BREAK)
         print("COMPARISON:")
         
         # Check steps count
@@ -123,6 +134,11 @@ def main():
         load_inst = metadata.get('instrument_id')
         print(f"Instrument ID - Original: {orig_inst}, Loaded: {load_inst}, Match: {orig_inst == load_inst}")
         
+        # The library stores binary frames; show the stored file as JSON
+        saved_item = next(item for item in pm.list_patterns() if item['name'] == 'test_kick')
+        stored_json = pm.export_item_json(saved_item['filename'])
+        print(f"Stored file {saved_item['filename']} exports as JSON: {stored_json is not None}")
+        
     else:
         print("Load failed!")
     
@@ -17,6 +17,10 @@ import os
 import time
 import numpy as np
 import logging
+import math
+import statistics
+import timeit
+import tracemalloc
 from typing import List, Dict
 import gc
 
@@ -47,6 +51,10 @@ NoteEvent = music_structures.NoteEvent
 Instrument = synthesis.Instrument
 SAMPLE_RATE = synthesis.SAMPLE_RATE
 
+# Operations faster than this are timed in batches rather than one call at a time
+FAST_OPERATION_S = 10e-6
+FAST_OPERATION_WINDOW_S = 1e-3
+
 class PerformanceProfiler:
     """Measures performance of specific operations."""
     
@@ -55,29 +63,80 @@ class PerformanceProfiler:
         
     def time_operation(self, name: str, operation_func, iterations: int = 1):
         """Time an operation and return average time per iteration."""
+        perf_counter = time.perf_counter  # Local binding keeps lookups out of the timed loop
         times = []
         
-        for i in range(iterations):
-            start_time = time.perf_counter()
-            result = operation_func()
-            end_time = time.perf_counter()
-            times.append(end_time - start_time)
+        # Collect up front and keep the collector out of the timed region, so
+        # GC pauses don't land in random samples
+        gc.collect()
+        gc.disable()
+        try:
+            for i in range(iterations):
+                start_time = perf_counter()
+                result = operation_func()
+                end_time = perf_counter()
+                times.append(end_time - start_time)
+        finally:
+            gc.enable()
+        
+        # Operations this fast are below the timer's resolution, so re-measure each
+        # sample as a batch of calls lasting at least FAST_OPERATION_WINDOW_S
+        # (timeit disables GC while timing as well)
+        if min(times) < FAST_OPERATION_S:
+            number = math.ceil(FAST_OPERATION_WINDOW_S / max(min(times), 1e-9))
+            timer = timeit.Timer(operation_func, timer=perf_counter)
+            times = [total / number for total in timer.repeat(repeat=iterations, number=number)]
         
-        avg_time = sum(times) / len(times)
+        # The median and a 10% trimmed mean are the headline numbers, since the
+        # plain mean is pulled around by GC pauses and scheduler jitter
+        total_time = sum(times)
+        avg_time = total_time / len(times)
+        median_time = statistics.median(times)
+        trim = len(times) // 10
+        trimmed_mean = statistics.mean(sorted(times)[trim:len(times) - trim])
         min_time = min(times)
         max_time = max(times)
         
         self.results[name] = {
             'avg_time_ms': avg_time * 1000,
+            'median_time_ms': median_time * 1000,
+            'trimmed_mean_ms': trimmed_mean * 1000,
             'min_time_ms': min_time * 1000,
             'max_time_ms': max_time * 1000,
             'iterations': iterations,
-            'total_time_ms': sum(times) * 1000
+            'total_time_ms': total_time * 1000
         }
         
-        print(f"{name}: {avg_time*1000:.3f}ms avg ({min_time*1000:.3f}-{max_time*1000:.3f}ms range)")
+        print(f"{name}: {median_time*1000:.3f}ms median, {trimmed_mean*1000:.3f}ms trimmed mean ({min_time*1000:.3f}-{max_time*1000:.3f}ms range)")
         return result
 
+def peak_allocation_bytes(operation_func) -> int:
+    """Peak memory allocated during one call of operation_func, measured with tracemalloc."""
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        operation_func()
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+# Sample offsets within a block, built once instead of on every sine_block call
+BLOCK_INDEX = np.arange(1024, dtype=np.float32)
+
+def sine_block(frequency: float, num_samples: int, phase0: float, out: np.ndarray):
+    """Fill out with one block of a sine wave starting at phase0; returns (out, next phase)."""
+    phase_increment = (2 * np.pi * frequency) / SAMPLE_RATE
+    if num_samples <= len(BLOCK_INDEX):
+        index = BLOCK_INDEX[:num_samples]
+    else:
+        index = np.arange(num_samples, dtype=np.float32)
+    # Build the phases in out itself so the block allocates no temporaries
+    np.multiply(index, np.float32(phase_increment), out=out)
+    out += np.float32(phase0)
+    np.sin(out, out=out)
+    return out, (phase0 + num_samples * phase_increment) % (2 * np.pi)
+
 def test_sample_generation_bottleneck():
     """Test the inefficient next() call pattern vs vectorized generation."""
     print("\n=== TESTING SAMPLE GENERATION BOTTLENECK ===")
@@ -99,11 +158,15 @@ def test_sample_generation_bottleneck():
     def inefficient_generation():
         return np.array([next(generator) for _ in range(num_samples)])
     
-    # Test vectorized method
+    # Test vectorized method: whole blocks, with the phase carried between calls
+    # the way a streaming oscillator needs it
+    block_buffer = np.empty(num_samples, dtype=np.float32)
+    phase_state = 0.0
+    
     def vectorized_generation():
-        phase_increment = (2 * np.pi * 440) / SAMPLE_RATE
-        phases = np.arange(num_samples) * phase_increment
-        return np.sin(phases)
+        nonlocal phase_state
+        samples, phase_state = sine_block(440, num_samples, phase_state, block_buffer)
+        return samples
     
     print(f"Generating {num_samples} samples at 440Hz:")
     
@@ -112,7 +175,7 @@ def test_sample_generation_bottleneck():
     vectorized_result = profiler.time_operation("Vectorized (optimized)", vectorized_generation, 100)
     
     # Calculate speedup
-    speedup = profiler.results["Inefficient (current)"]["avg_time_ms"] / profiler.results["Vectorized (optimized)"]["avg_time_ms"]
+    speedup = profiler.results["Inefficient (current)"]["median_time_ms"] / profiler.results["Vectorized (optimized)"]["median_time_ms"]
     print(f"Vectorized method is {speedup:.1f}x faster")
     
     return profiler.results
@@ -132,11 +195,18 @@ def test_logging_overhead():
     handler.setLevel(logging.DEBUG)
     logger.addHandler(handler)
     
-    # Test with logging
+    # Test with logging; %-style arguments are only formatted if the record is emitted
     def with_logging():
         for i in range(100):  # Simulate processing 100 notes
-            logger.debug(f"Processing note {i}: C4, is_active: True")
-            logger.debug(f"Note {i} processed successfully")
+            logger.debug("Processing note %d: %s, is_active: %s", i, "C4", True)
+            logger.debug("Note %d processed successfully", i)
+    
+    # Test with the calls guarded, as a hot callback would do with logging turned down
+    def with_logging_gated():
+        for i in range(100):
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Processing note %d: %s, is_active: %s", i, "C4", True)
+                logger.debug("Note %d processed successfully", i)
     
     # Test without logging
     def without_logging():
@@ -154,11 +224,14 @@ def test_logging_overhead():
     
     # Disable logging for test
     logger.setLevel(logging.CRITICAL)
+    gated_log_result = profiler.time_operation("Gated Logging (disabled)", with_logging_gated, 50)
     without_log_result = profiler.time_operation("Without Logging", without_logging, 50)
     
     # Calculate overhead
-    overhead = profiler.results["With Debug Logging"]["avg_time_ms"] - profiler.results["Without Logging"]["avg_time_ms"]
+    overhead = profiler.results["With Debug Logging"]["median_time_ms"] - profiler.results["Without Logging"]["median_time_ms"]
+    gated_overhead = profiler.results["Gated Logging (disabled)"]["median_time_ms"] - profiler.results["Without Logging"]["median_time_ms"]
     print(f"Logging adds {overhead:.3f}ms overhead per 100 operations")
+    print(f"Gated, disabled logging adds {gated_overhead:.3f}ms overhead per 100 operations")
     
     # Clean up
     logger.removeHandler(handler)
@@ -173,41 +246,46 @@ def test_memory_allocation_pressure():
     
     num_samples = 1024
     
+    # Generate each instrument's "output" up front so the timings measure
+    # allocation vs reuse rather than the random number generator
+    noise = np.random.default_rng(0).random((10, num_samples))
+    
     # Test current pattern: allocate new arrays every time
     def allocate_every_time():
         buffers = []
         for i in range(10):  # Simulate 10 instruments
-            buffer = np.zeros(num_samples)  # New allocation
-            buffer += np.random.random(num_samples)  # More allocation
+            buffer = np.empty(num_samples)  # New allocation; fully overwritten below
+            np.copyto(buffer, noise[i])
             buffers.append(buffer)
         return sum(buffers)  # Final allocation
     
     # Test optimized pattern: reuse buffers
     def reuse_buffers():
-        # Create buffers inside function to avoid scope issues
+        # Create buffers inside function to avoid scope issues; this one is
+        # accumulated into, so it is the only buffer that must start zeroed
         reused_buffer = np.zeros(num_samples)
-        temp_buffer = np.zeros(num_samples)
         
         for i in range(10):  # Simulate 10 instruments
-            temp_buffer[:] = np.random.random(num_samples)  # Fill temp buffer
-            reused_buffer += temp_buffer  # In-place addition
+            np.add(reused_buffer, noise[i], out=reused_buffer)  # In-place, no temp buffer
         return reused_buffer
     
-    print(f"Processing 10 instruments with {num_samples} samples each:")
+    # Test fused pattern: mix every instrument in a single reduction
+    def bulk_reduce():
+        reused_buffer = np.empty(num_samples)
+        return noise.sum(axis=0, out=reused_buffer)
     
-    # Measure memory allocations
-    gc.collect()  # Clean start
-    mem_before = len(gc.get_objects())
+    print(f"Processing 10 instruments with {num_samples} samples each:")
     
     alloc_result = profiler.time_operation("Allocate Every Time", allocate_every_time, 100)
-    
-    mem_after_alloc = len(gc.get_objects())
-    
     reuse_result = profiler.time_operation("Reuse Buffers", reuse_buffers, 100)
+    bulk_result = profiler.time_operation("Bulk Reduce", bulk_reduce, 100)
     
-    mem_after_reuse = len(gc.get_objects())
+    # Measure memory allocations separately, since tracing slows the timed code down
+    alloc_bytes = peak_allocation_bytes(allocate_every_time)
+    reuse_bytes = peak_allocation_bytes(reuse_buffers)
+    bulk_bytes = peak_allocation_bytes(bulk_reduce)
     
-    print(f"Objects created - Allocate: {mem_after_alloc - mem_before}, Reuse: {mem_after_reuse - mem_after_alloc}")
+    print(f"Peak bytes allocated per call - Allocate: {alloc_bytes}, Reuse: {reuse_bytes}, Bulk: {bulk_bytes}")
     
     return profiler.results
 
@@ -217,17 +295,22 @@ def test_note_processing_scaling():
     
     profiler = PerformanceProfiler()
     
-    # Create test instruments with varying numbers of active notes
+    # One instrument is built up front and re-voiced for each note count;
+    # its settings are the same for every case
+    instrument = Instrument(
+        name="scaling_test",
+        oscillators=[{'waveform': 'sine', 'amplitude': 0.1}],
+        attack=0.01, decay=0.1, sustain_level=0.7, release=0.2
+    )
+    pitch_classes = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+    
     def create_test_instrument(num_notes: int):
-        instrument = Instrument(
-            name=f"test_{num_notes}",
-            oscillators=[{'waveform': 'sine', 'amplitude': 0.1}],
-            attack=0.01, decay=0.1, sustain_level=0.7, release=0.2
-        )
+        instrument.active_notes = []
         
-        # Add active notes
+        # Add active notes; names must be distinct because note_on retriggers
+        # (replaces) a note that is already sounding
         for i in range(num_notes):
-            note_name = f"C{4 + (i % 2)}"
+            note_name = f"{pitch_classes[i % 12]}{2 + i // 12}"
             instrument.note_on(note_name, 0.5)
         
         return instrument
@@ -244,7 +327,7 @@ def test_note_processing_scaling():
         
         print(f"Processing instrument with {count} active notes:")
         result = profiler.time_operation(f"{count} Notes", process_instrument, 20)
-        results[count] = profiler.results[f"{count} Notes"]["avg_time_ms"]
+        results[count] = profiler.results[f"{count} Notes"]["median_time_ms"]
     
     # Analyze scaling
     print("\nScaling analysis:")
@@ -256,6 +339,47 @@ def test_note_processing_scaling():
     
     return results
 
+def test_block_size_overhead():
+    """Test the per-call overhead of rendering the same audio in smaller blocks."""
+    print("\n=== TESTING BLOCK SIZE OVERHEAD ===")
+    
+    profiler = PerformanceProfiler()
+    
+    instrument = Instrument(
+        name="block_size_test",
+        oscillators=[{'waveform': 'sine', 'amplitude': 0.1}],
+        attack=0.01, decay=0.1, sustain_level=0.7, release=0.2
+    )
+    for note_name in ("C3", "E3", "G3", "C4", "E4", "G4", "C5", "E5"):
+        instrument.note_on(note_name, 0.5)
+    
+    # Every variant renders the same 1024 samples into one host-owned buffer
+    total_samples = 1024
+    block_sizes = [64, 128, 256, 1024]
+    scratch = np.empty(total_samples)
+    results = {}
+    
+    for block_size in block_sizes:
+        blocks = [scratch[start:start + block_size] for start in range(0, total_samples, block_size)]
+        
+        def render_blocks():
+            for block in blocks:
+                instrument.process_into(block)
+        
+        label = f"{block_size}-sample blocks"
+        print(f"Rendering {total_samples} samples as {len(blocks)} x {block_size}:")
+        profiler.time_operation(label, render_blocks, 20)
+        results[block_size] = profiler.results[label]["median_time_ms"]
+    
+    print("\nPer-call overhead relative to one 1024-sample block:")
+    for block_size in block_sizes[:-1]:
+        print(f"{block_size}-sample blocks: {results[block_size] / results[total_samples]:.2f}x time")
+    
+    return results
+
+# Notes triggered by the accumulation simulation, cycled beat by beat
+ACCUMULATION_NOTES = ("C4", "C5", "C6")
+
 def test_note_accumulation_simulation():
     """Simulate note accumulation over time."""
     print("\n=== TESTING NOTE ACCUMULATION SIMULATION ===")
@@ -268,6 +392,12 @@ def test_note_accumulation_simulation():
         oscillators=[{'waveform': 'sine', 'amplitude': 0.1}],
         attack=0.01, decay=0.1, sustain_level=0.7, release=0.5  # Longer release
     )
+    block = np.empty(1024)  # Rendered into every second; nothing allocated per call
+    
+    # Warm up the render path once so second 0 does not carry first-call costs
+    instrument.note_on(ACCUMULATION_NOTES[0], 0.5)
+    instrument.process_into(block)
+    instrument.active_notes = []
     
     note_counts = []
     processing_times = []
@@ -278,8 +408,7 @@ def test_note_accumulation_simulation():
     for second in range(30):
         # Add 2 notes per second (simulating beat triggers)
         for beat in range(2):
-            note_name = f"C{4 + ((second * 2 + beat) % 3)}"
-            instrument.note_on(note_name, 0.5)
+            instrument.note_on(ACCUMULATION_NOTES[(second * 2 + beat) % 3], 0.5)
         
         # Sometimes turn off notes (simulating note_off events)
         if second % 3 == 0 and instrument.active_notes:
@@ -289,7 +418,7 @@ def test_note_accumulation_simulation():
         
         # Measure processing time
         start_time = time.perf_counter()
-        instrument.process(1024)
+        instrument.process_into(block)
         processing_time = (time.perf_counter() - start_time) * 1000
         
         active_count = len(instrument.active_notes)
@@ -338,6 +467,7 @@ def main():
     print("3. Memory allocation pressure")
     print("4. Note processing scaling")
     print("5. Note accumulation over time")
+    print("6. Block size overhead")
     print()
     
     all_results = {}
@@ -349,6 +479,7 @@ def main():
         all_results['memory_allocation'] = test_memory_allocation_pressure()
         all_results['note_scaling'] = test_note_processing_scaling()
         all_results['note_accumulation'] = test_note_accumulation_simulation()
+        all_results['block_size'] = test_block_size_overhead()
         
     except Exception as e:
         print(f"Error during testing: {e}")
@@ -366,13 +497,13 @@ def main():
     if 'sample_generation' in all_results:
         sg = all_results['sample_generation']
         if 'Inefficient (current)' in sg and 'Vectorized (optimized)' in sg:
-            speedup = sg['Inefficient (current)']['avg_time_ms'] / sg['Vectorized (optimized)']['avg_time_ms']
+            speedup = sg['Inefficient (current)']['median_time_ms'] / sg['Vectorized (optimized)']['median_time_ms']
             print(f"• Sample generation: Vectorization provides {speedup:.1f}x speedup")
     
     if 'logging_overhead' in all_results:
         lo = all_results['logging_overhead']
         if 'With Debug Logging' in lo and 'Without Logging' in lo:
-            overhead = lo['With Debug Logging']['avg_time_ms'] - lo['Without Logging']['avg_time_ms']
+            overhead = lo['With Debug Logging']['median_time_ms'] - lo['Without Logging']['median_time_ms']
             print(f"• Logging overhead: {overhead:.3f}ms per 100 operations")
     
     if 'note_accumulation' in all_results:
@@ -396,7 +527,7 @@ def main():
     if 'sample_generation' in all_results:
         sg = all_results['sample_generation']
         if 'Inefficient (current)' in sg and 'Vectorized (optimized)' in sg:
-            speedup = sg['Inefficient (current)']['avg_time_ms'] / sg['Vectorized (optimized)']['avg_time_ms']
+            speedup = sg['Inefficient (current)']['median_time_ms'] / sg['Vectorized (optimized)']['median_time_ms']
             if speedup > 10:  # Significant speedup
                 recommendations.append(f"HIGH PRIORITY: Vectorize sample generation ({speedup:.1f}x speedup potential)")
     
@@ -404,7 +535,7 @@ def main():
     if 'logging_overhead' in all_results:
         lo = all_results['logging_overhead']
         if 'With Debug Logging' in lo and 'Without Logging' in lo:
-            overhead = lo['With Debug Logging']['avg_time_ms'] - lo['Without Logging']['avg_time_ms']
+            overhead = lo['With Debug Logging']['median_time_ms'] - lo['Without Logging']['median_time_ms']
             if overhead > 1.0:  # More than 1ms overhead
                 recommendations.append(f"HIGH PRIORITY: Remove debug logging from audio callbacks ({overhead:.1f}ms overhead)")
     
@@ -412,7 +543,7 @@ def main():
     if 'memory_allocation' in all_results:
         ma = all_results['memory_allocation']
         if 'Allocate Every Time' in ma and 'Reuse Buffers' in ma:
-            speedup = ma['Allocate Every Time']['avg_time_ms'] / ma['Reuse Buffers']['avg_time_ms']
+            speedup = ma['Allocate Every Time']['median_time_ms'] / ma['Reuse Buffers']['median_time_ms']
             if speedup > 1.5:
                 recommendations.append(f"MEDIUM PRIORITY: Implement buffer reuse ({speedup:.1f}x speedup)")
     
@@ -11,28 +11,32 @@ from src.tui import MusicEngine
 from src.music_structures import Composition, Track, Pattern, NoteEvent
 from src.synthesis import Instrument
 import logging
-import asyncio
+
+# Test logger, configured once for the whole run
+TEST_LOGGER = logging.getLogger('test')
+TEST_LOGGER.setLevel(logging.INFO)
+
+# Output separators, built once
+SEPARATOR = "=" * 50
+SECTION_BREAK = "\n" + SEPARATOR
 
 def create_test_music_engine():
     """Create a MusicEngine with test data similar to what TUI would have."""
-    # Create logger
-    logger = logging.getLogger('test')
-    logger.setLevel(logging.INFO)
-    
     # Create music engine with TEST patterns directory
-    engine = MusicEngine(logger)
+    engine = MusicEngine(TEST_LOGGER)
     # Override pattern manager to use test directory
     engine.pattern_manager = engine.pattern_manager.__class__("test_patterns_integration")
     
     # Create a test composition with pattern and instrument
     composition = Composition(bpm=120)
     
-    # Create a kick pattern
-    pattern = Pattern(steps=[None] * 16)
-    pattern.steps[0] = NoteEvent(note='C2', velocity=100, duration=1)
-    pattern.steps[4] = NoteEvent(note='C2', velocity=80, duration=1)
-    pattern.steps[8] = NoteEvent(note='C2', velocity=100, duration=1)
-    pattern.steps[12] = NoteEvent(note='C2', velocity=90, duration=1)
+    # Create a kick pattern: kicks on steps 0, 4, 8 and 12
+    pattern = Pattern(steps=[
+        NoteEvent(note='C2', velocity=100, duration=1), None, None, None,
+        NoteEvent(note='C2', velocity=80, duration=1), None, None, None,
+        NoteEvent(note='C2', velocity=100, duration=1), None, None, None,
+        NoteEvent(note='C2', velocity=90, duration=1), None, None, None,
+    ])
     
     # Create track
     track = Track(instrument_id='test_kick')
@@ -58,35 +62,57 @@ def create_test_music_engine():
     
     return engine
 
-def print_composition_state(engine, title):
-    """Print the current state of the composition."""
+def scan_pattern(pattern):
+    """Return the pattern's active steps as (step index, note, velocity) tuples."""
+    return [(j, step.note, step.velocity) 
+            for j, step in enumerate(pattern.steps) 
+            if step and step.note]
+
+def scan_tracks(engine):
+    """Scan the first pattern of every track once; None for tracks without patterns."""
+    return [scan_pattern(track.patterns[0]) if track.patterns else None
+            for track in engine.composition.tracks]
+
+def pattern_density(active_notes):
+    """Classify a scanned pattern as sparse, medium or dense (same thresholds as the TUI)."""
+    active_steps = len(active_notes)
+    if active_steps <= 4:
+        return "sparse"
+    elif active_steps >= 12:
+        return "dense"
+    return "medium"
+
+def print_composition_state(engine, title, scans=None):
+    """Print the current state of the composition.
+
+    scans is the result of scan_tracks(engine); it is computed here if not given.
+    """
+    if scans is None:
+        scans = scan_tracks(engine)
     print(f"\n=== {title} ===")
     print(f"Tracks: {len(engine.composition.tracks)}")
     print(f"Instruments: {list(engine.instruments.keys())}")
     
-    for i, track in enumerate(engine.composition.tracks):
+    for i, (track, active_steps) in enumerate(zip(engine.composition.tracks, scans)):
         print(f"Track {i}: {track.instrument_id}")
         if track.patterns:
-            pattern = track.patterns[0]
-            active_steps = [(j, step.note, step.velocity) 
-                          for j, step in enumerate(pattern.steps) 
-                          if step and step.note]
-            print(f"  Pattern steps: {len(pattern.steps)}")
+            print(f"  Pattern steps: {len(track.patterns[0].steps)}")
             print(f"  Active notes: {active_steps}")
         else:
             print("  No patterns")
 
-async def test_pattern_save_load_integration():
+def test_pattern_save_load_integration():
     """Test the complete pattern save/load cycle as it would work in TUI."""
     print("Testing TUI Pattern Save/Load Integration")
-    print("=" * 50)
+    print(SEPARATOR)
     
     # Create test music engine
     engine = create_test_music_engine()
-    print_composition_state(engine, "ORIGINAL STATE")
+    original_scans = scan_tracks(engine)
+    print_composition_state(engine, "ORIGINAL STATE", original_scans)
     
     # Simulate saving a pattern (like worker_save_pattern would do)
-    print("\n" + "="*50)
+    print(SECTION_BREAK)
     print("SIMULATING PATTERN SAVE...")
     
     if not engine.composition.tracks:
@@ -106,13 +132,7 @@ async def test_pattern_save_load_integration():
     if instrument_id:
         tags.append(instrument_id.replace('_', ' '))
     
-    active_steps = sum(1 for step in pattern.steps if step and step.note)
-    if active_steps <= 4:
-        tags.append("sparse")
-    elif active_steps >= 12:
-        tags.append("dense")
-    else:
-        tags.append("medium")
+    tags.append(pattern_density(original_scans[0]))
     
     # Save pattern
     success = engine.pattern_manager.save_pattern(
@@ -125,7 +145,7 @@ async def test_pattern_save_load_integration():
         print(f"Pattern saved with tags: {tags_str}")
     
     # Clear composition to simulate loading into empty state
-    print("\n" + "="*50)
+    print(SECTION_BREAK)
     print("CLEARING COMPOSITION...")
     engine.composition.tracks = []
     engine.instruments = {}
@@ -133,7 +153,7 @@ async def test_pattern_save_load_integration():
     print_composition_state(engine, "CLEARED STATE")
     
     # Simulate loading a pattern (like worker_load_pattern would do)
-    print("\n" + "="*50)
+    print(SECTION_BREAK)
     print("SIMULATING PATTERN LOAD...")
     
     result = engine.pattern_manager.load_pattern("test_integration")
@@ -174,21 +194,18 @@ async def test_pattern_save_load_integration():
     engine.sequencer.update_composition(engine.composition, engine.instruments)
     
     print("Pattern loaded successfully!")
-    print_composition_state(engine, "LOADED STATE")
+    loaded_scans = scan_tracks(engine)
+    print_composition_state(engine, "LOADED STATE", loaded_scans)
     
     # Compare original vs loaded
-    print("\n" + "="*50)
+    print(SECTION_BREAK)
     print("COMPARISON RESULTS:")
     
     if len(engine.composition.tracks) == 1:
         loaded_track = engine.composition.tracks[0]
         if loaded_track.patterns:
-            loaded_pattern = loaded_track.patterns[0]
-            
             # Compare active notes
-            loaded_notes = [(j, step.note, step.velocity) 
-                          for j, step in enumerate(loaded_pattern.steps) 
-                          if step and step.note]
+            loaded_notes = loaded_scans[0]
             expected_notes = [(0, 'C2', 100), (4, 'C2', 80), (8, 'C2', 100), (12, 'C2', 90)]
             
             print(f"Expected notes: {expected_notes}")
@@ -212,8 +229,5 @@ async def test_pattern_save_load_integration():
     else:
         print("\nFailed to clean up test files.")
 
-async def main():
-    await test_pattern_save_load_integration()
-
 if __name__ == "__main__":
-    asyncio.run(main())
+    test_pattern_save_load_integration()